@@ -1,283 +1,27 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib as mpl
-import seaborn as sns
-import os
+import io
+import cleaning
+import ingest
+import perf
+import quality
+import reports
+import rollup
+import schema
+import sketches
+import slicing
+import store
+import theme
+import viewer
+from store import COLUMNS, load_data
 
 # ── Page config ──────────────────────────────────────────────────────────────
 st.set_page_config(page_title="Sales Analytics Dashboard", layout="wide")
 
 # ── Global CSS: Warm Earthy Professional ──────────────────────────────────────
-st.markdown("""
-<style>
-/* Import fonts */
-@import url('https://fonts.googleapis.com/css2?family=Instrument+Serif:ital@0;1&family=DM+Sans:wght@300;400;500;600&family=DM+Mono:wght@400;500&display=swap');
-
-/* Root variables — warm earthy palette */
-:root {
-    --bg:            #F5F0EB;
-    --bg-alt:        #EDE7DE;
-    --surface:       #FAF7F4;
-    --surface-2:     #F0EAE1;
-    --border:        #DDD5C8;
-    --border-strong: #C9BFB0;
-    --text-primary:  #2C2418;
-    --text-secondary:#7A6E62;
-    --accent:        #B35C2A;
-    --accent-light:  #F5EDE5;
-    --accent-2:      #5C8C6E;
-    --success:       #4A7C5A;
-    --warning:       #B8870A;
-    --danger:        #A83232;
-    --radius:        12px;
-    --shadow:        0 2px 12px rgba(44,36,24,0.08);
-}
-
-/* Base */
-html, body, [class*="css"] {
-    font-family: 'DM Sans', sans-serif;
-    color: var(--text-primary);
-}
-
-.stApp { background: var(--bg); }
-
-/* Hide default streamlit chrome */
-#MainMenu, footer, header { visibility: hidden; }
-.block-container {
-    padding: 2.5rem 3.5rem 4rem 3.5rem;
-    max-width: 1240px;
-}
-
-/* Title area — editorial serif display */
-h1 {
-    font-family: 'Instrument Serif', Georgia, serif !important;
-    font-size: 2rem !important;
-    font-weight: 400 !important;
-    letter-spacing: -0.01em;
-    color: var(--text-primary) !important;
-    margin-bottom: 0.1rem !important;
-    line-height: 1.2 !important;
-}
-
-h2 {
-    font-family: 'Instrument Serif', Georgia, serif !important;
-    font-size: 1.35rem !important;
-    font-weight: 400 !important;
-    letter-spacing: -0.01em;
-    color: var(--text-primary) !important;
-    border-bottom: 1px solid var(--border) !important;
-    padding-bottom: 0.5rem !important;
-    margin-bottom: 1.2rem !important;
-}
-
-h3 {
-    font-size: 1rem !important;
-    font-weight: 600 !important;
-    color: var(--text-primary) !important;
-    letter-spacing: 0.01em;
-}
-
-/* Sidebar — warm toned */
-[data-testid="stSidebar"] {
-    background: var(--surface) !important;
-    border-right: 1px solid var(--border) !important;
-}
-
-[data-testid="stSidebar"] .stRadio label {
-    font-size: 0.84rem;
-    color: var(--text-secondary);
-    padding: 0.45rem 0;
-    transition: color 0.15s;
-}
-
-[data-testid="stSidebar"] .stRadio label:hover {
-    color: var(--accent) !important;
-}
-
-/* Metric cards — warm shadow */
-[data-testid="stMetric"] {
-    background: var(--surface);
-    border: 1px solid var(--border);
-    border-radius: var(--radius);
-    padding: 1.1rem 1.4rem !important;
-    box-shadow: var(--shadow);
-    border-top: 3px solid var(--accent) !important;
-}
-
-[data-testid="stMetricLabel"] {
-    font-size: 0.7rem;
-    color: var(--text-secondary);
-    text-transform: uppercase;
-    letter-spacing: 0.08em;
-    font-weight: 600;
-}
-[data-testid="stMetricValue"] {
-    font-family: 'Instrument Serif', Georgia, serif;
-    font-size: 2rem;
-    font-weight: 400;
-    color: var(--accent);
-}
-[data-testid="stMetricDelta"] { font-size: 0.8rem; }
-
-/* Tables */
-[data-testid="stTable"] table, .stDataFrame table {
-    font-size: 0.82rem;
-    border-collapse: collapse;
-    width: 100%;
-    background: var(--surface);
-    border-radius: var(--radius);
-    overflow: hidden;
-}
-
-[data-testid="stTable"] thead th, .stDataFrame thead th {
-    background: var(--bg-alt) !important;
-    color: var(--text-secondary);
-    font-weight: 600;
-    font-size: 0.7rem;
-    text-transform: uppercase;
-    letter-spacing: 0.08em;
-    padding: 0.7rem 1rem !important;
-    border-bottom: 2px solid var(--border-strong) !important;
-}
-
-[data-testid="stTable"] tbody td, .stDataFrame tbody td {
-    padding: 0.6rem 1rem !important;
-    border-bottom: 1px solid var(--border) !important;
-    color: var(--text-primary);
-    font-family: 'DM Mono', monospace;
-    font-size: 0.79rem;
-    background: var(--surface);
-}
-
-[data-testid="stTable"] tbody tr:nth-child(even) td,
-.stDataFrame tbody tr:nth-child(even) td {
-    background: var(--surface-2) !important;
-}
-
-[data-testid="stTable"] tbody tr:hover td,
-.stDataFrame tbody tr:hover td {
-    background: var(--accent-light) !important;
-}
-
-/* Buttons */
-.stButton > button {
-    background: var(--accent);
-    color: #FAF7F4;
-    border: none;
-    border-radius: 8px;
-    padding: 0.5rem 1.3rem;
-    font-family: 'DM Sans', sans-serif;
-    font-size: 0.82rem;
-    font-weight: 600;
-    cursor: pointer;
-    transition: all 0.18s ease;
-    letter-spacing: 0.02em;
-    box-shadow: 0 1px 4px rgba(179,92,42,0.3);
-}
-.stButton > button:hover {
-    background: #9B4E22;
-    box-shadow: 0 3px 12px rgba(179,92,42,0.35);
-    transform: translateY(-1px);
-}
-
-/* Alerts */
-.stSuccess, .stInfo, .stWarning, .stError {
-    border-radius: var(--radius) !important;
-    font-size: 0.84rem !important;
-}
-.stSuccess { border-left: 4px solid var(--success) !important;  background: #EDF5F0 !important; border: 1px solid #C4DDD0 !important; }
-.stInfo    { border-left: 4px solid var(--accent) !important;   background: var(--accent-light) !important; border: 1px solid #E0C9B5 !important; }
-.stWarning { border-left: 4px solid var(--warning) !important;  background: #FDF5DC !important; border: 1px solid #E8D68A !important; }
-.stError   { border-left: 4px solid var(--danger) !important;   background: #FAEAEA !important; border: 1px solid #E0B0B0 !important; }
-
-/* Expander */
-details {
-    border: 1px solid var(--border) !important;
-    border-radius: var(--radius) !important;
-    padding: 0.3rem 0.5rem !important;
-    background: var(--surface);
-    box-shadow: var(--shadow);
-}
-summary { font-size: 0.85rem; font-weight: 600; color: var(--text-primary); }
-
-/* Divider */
-hr { border-color: var(--border) !important; margin: 2rem 0 !important; }
-
-/* Forms */
-.stTextInput input, .stNumberInput input, .stSelectbox select {
-    border: 1px solid var(--border-strong) !important;
-    border-radius: 8px !important;
-    font-size: 0.84rem !important;
-    font-family: 'DM Sans', sans-serif !important;
-    background: var(--surface) !important;
-    color: var(--text-primary) !important;
-}
-.stTextInput input:focus, .stNumberInput input:focus {
-    border-color: var(--accent) !important;
-    box-shadow: 0 0 0 3px rgba(179,92,42,0.12) !important;
-}
-
-/* Section header stripe */
-.section-badge {
-    display: inline-block;
-    background: var(--accent);
-    color: #FAF7F4;
-    font-size: 0.68rem;
-    font-weight: 700;
-    letter-spacing: 0.1em;
-    text-transform: uppercase;
-    padding: 0.2rem 0.6rem;
-    border-radius: 4px;
-    margin-bottom: 0.5rem;
-}
-</style>
-""", unsafe_allow_html=True)
-
-# ── Matplotlib style ──────────────────────────────────────────────────────────
-PALETTE = ["#B35C2A", "#5C8C6E", "#C4973A", "#A83232", "#7A6E8C", "#4A7080"]
-mpl.rcParams.update({
-    "font.family": "sans-serif",
-    "font.sans-serif": ["DM Sans", "Helvetica Neue", "Arial"],
-    "axes.spines.top": False,
-    "axes.spines.right": False,
-    "axes.spines.left": False,
-    "axes.spines.bottom": True,
-    "axes.grid": True,
-    "grid.color": "#DDD5C8",
-    "grid.linewidth": 0.7,
-    "grid.alpha": 0.7,
-    "axes.facecolor": "#FAF7F4",
-    "figure.facecolor": "#FAF7F4",
-    "axes.labelcolor": "#7A6E62",
-    "xtick.color": "#7A6E62",
-    "ytick.color": "#7A6E62",
-    "xtick.labelsize": 9,
-    "ytick.labelsize": 9,
-    "axes.titlesize": 12,
-    "axes.titleweight": "600",
-    "axes.titlepad": 16,
-    "axes.edgecolor": "#DDD5C8",
-    "figure.dpi": 120,
-})
-
-# ── Data ──────────────────────────────────────────────────────────────────────
-def load_data():
-    file_path = 'sales_data.csv'
-    if not os.path.exists(file_path):
-        initial_data = pd.DataFrame({
-            "Date": ["2023-01-15", "2023-01-20"],
-            "Product_ID": ["P001", "P002"],
-            "Product Name": ["Laptop", "Mouse"],
-            "Category": ["IT", "IT"],
-            "Quantity": [10, 50],
-            "Unit Price": [25000, 500],
-            "Region": ["North", "South"]
-        })
-        initial_data.to_csv(file_path, index=False)
-    return pd.read_csv(file_path)
-
-df = load_data()
+# Streamlit rebuilds the page on every rerun, so the tag is sent each time,
+# but it is minified once per process in theme.py.
+st.markdown(theme.STYLE_TAG, unsafe_allow_html=True)
 
 # ── Header ────────────────────────────────────────────────────────────────────
 st.markdown('<div style="display:flex;align-items:center;gap:0.8rem;margin-bottom:0.2rem;"><span style="background:#B35C2A;color:#FAF7F4;font-size:0.65rem;font-weight:700;letter-spacing:0.12em;text-transform:uppercase;padding:0.2rem 0.55rem;border-radius:4px;">Dashboard</span></div>', unsafe_allow_html=True)
@@ -295,7 +39,69 @@ menu = st.sidebar.radio("", [
     "5. การแสดงผลข้อมูล (Visualization)"
 ], label_visibility="collapsed")
 
+# ── Data ──────────────────────────────────────────────────────────────────────
+# Only the pages that work on raw rows read the store.
+RAW_DATA_PAGES = ("0. จัดการข้อมูล (เพิ่ม/ลบ)", "1. ตรวจสอบคุณภาพข้อมูล")
+df = None
+if menu in RAW_DATA_PAGES:
+    # Read before the rows: a compaction in between can only make a delete refuse.
+    generation = store.generation()
+    with perf.stage("load") as stage:
+        df = load_data()
+        stage.rows = len(df)
+
+
+# ── Filters (Sections 3 and 5) ────────────────────────────────────────────────
+def analysis_filters(cube, key):
+    """Date range / region / category widgets; None when nothing is filtered."""
+    months = pd.to_datetime(cube['Month'])
+    first, last = months.min().date(), (months.max() + pd.offsets.MonthEnd(0)).date()
+    f1, f2, f3 = st.columns([2, 1, 1])
+    period     = f1.date_input("ช่วงวันที่", (first, last), min_value=first, max_value=last, key=f"{key}_period")
+    regions    = f2.multiselect("ภูมิภาค", sorted(cube['Region'].dropna().unique()), key=f"{key}_regions")
+    categories = f3.multiselect("หมวดหมู่", sorted(cube['Category'].dropna().unique()), key=f"{key}_categories")
+    start, end = period if len(period) == 2 else (period[0], period[0])
+    if (start, end) == (first, last) and not regions and not categories:
+        return None
+    return {"start": start, "end": end, "regions": regions, "categories": categories}
+
+
+def filtered_cube(key):
+    """(report, rollup cube, filters) for Sections 3 and 5, with the filter widgets shown.
+
+    The cube comes from a precomputed report (reports.py) when it matches
+    the data, else live; with filters it is the filtered cube instead.
+    """
+    with perf.stage("report"):
+        report = reports.latest()
+    # Shared by all sessions; cleaned on first access after the data changes.
+    with st.spinner("กำลังเตรียมข้อมูลที่ทำความสะอาดแล้ว..."), perf.stage("rollup") as stage:
+        cube = report['cube'] if report else cleaning.clean_rollup()
+        stage.rows = len(cube)
+
+    filters = analysis_filters(cube, key) if not cube.empty else None
+    if filters:
+        with st.spinner("กำลังกรองข้อมูล..."), perf.stage("filter") as stage:
+            cube = slicing.filtered_rollup(**filters)
+            stage.rows = len(cube)
+        st.caption(f"ข้อมูลตามเงื่อนไข {cube['Rows'].sum():,} แถว")
+    return report, cube, filters
+
+
+def approx_sketch(filters):
+    """Sketches for approximate top-K (SALES_TOPK_MODE), or None to stay exact.
+
+    They cover the whole history, so filtered views are always exact.
+    """
+    if sketches.TOPK_MODE == 'exact' or filters:
+        return None
+    sketch = cleaning.clean_sketches()
+    return sketch if sketches.use_approx(sketch) else None
+
+
 # ── Section 0: Manage Data ────────────────────────────────────────────────────
+DELETE_VALUE_COLUMNS = ("Product Name", "Category", "Region")
+
 if menu == "0. จัดการข้อมูล (เพิ่ม/ลบ)":
     st.subheader("จัดการฐานข้อมูล")
 
@@ -311,32 +117,143 @@ if menu == "0. จัดการข้อมูล (เพิ่ม/ลบ)":
             new_reg   = c1.selectbox("ภูมิภาค", ["North", "South", "Central", "East", "West"])
             if st.form_submit_button("บันทึกข้อมูล"):
                 new_row = pd.DataFrame([[str(new_date), new_id, new_name, new_cat, new_qty, new_price, new_reg]],
-                                       columns=df.columns)
-                df = pd.concat([df, new_row], ignore_index=True)
-                df.to_csv('sales_data.csv', index=False)
+                                       columns=COLUMNS)
+                store.append_rows(new_row)
                 st.success("บันทึกข้อมูลสำเร็จ!")
                 st.rerun()
 
+    with st.expander("📋  เพิ่มข้อมูลหลายแถว (วางจาก Excel / CSV)"):
+        st.caption("ลำดับคอลัมน์: " + ", ".join(COLUMNS))
+        with st.form("bulk_add_form", clear_on_submit=True):
+            pasted = st.text_area("วางข้อมูล (คั่นด้วย , หรือ Tab)", height=160)
+            if st.form_submit_button("บันทึกทั้งหมด") and pasted.strip():
+                sep = '\t' if '\t' in pasted else ','
+                try:
+                    block = pd.read_csv(io.StringIO(pasted), sep=sep, header=None, dtype=str,
+                                        skip_blank_lines=True)
+                except pd.errors.ParserError as e:
+                    block = None
+                    st.error(f"อ่านข้อมูลไม่สำเร็จ: {e}")
+                if block is not None and block.shape[1] != len(COLUMNS):
+                    st.error(f"ต้องมี {len(COLUMNS)} คอลัมน์ แต่พบ {block.shape[1]} คอลัมน์")
+                elif block is not None:
+                    block.columns = COLUMNS
+                    if list(block.iloc[0].str.strip()) == COLUMNS:
+                        block = block.iloc[1:]
+                    added = store.append_rows(block)
+                    st.success(f"บันทึกข้อมูลสำเร็จ {added} แถว")
+                    st.rerun()
+
+    with st.expander("📤  นำเข้าไฟล์ (CSV / Excel)"):
+        st.caption("ต้องมีแถวหัวตารางที่มีคอลัมน์: " + ", ".join(COLUMNS))
+        upload = st.file_uploader("เลือกไฟล์", type=["csv", "xlsx", "xls"])
+        if st.button("นำเข้าข้อมูล", disabled=upload is None):
+            bar = st.progress(0.0, text="กำลังตรวจสอบไฟล์...")
+            try:
+                result = ingest.ingest(upload.name, upload.getvalue(), progress=lambda done, total: bar.progress(
+                    done / total, text=f"ตรวจสอบแล้ว {done}/{total} ส่วน"))
+            except ImportError:
+                st.error("ต้องติดตั้ง openpyxl เพื่ออ่านไฟล์ Excel")
+            except (ValueError, pd.errors.ParserError) as e:
+                st.error(f"อ่านไฟล์ไม่สำเร็จ: {e}")
+            else:
+                # Rejects are kept as CSV bytes so the download survives the rerun.
+                st.session_state['upload_result'] = {
+                    "name": upload.name, "rows": result["rows"], "added": result["added"],
+                    "counts": result["counts"], "rejects": result["rejects"].to_csv().encode('utf-8-sig'),
+                }
+                st.rerun()
+
+        uploaded = st.session_state.get('upload_result')
+        if uploaded:
+            st.success(f"นำเข้า {uploaded['name']} สำเร็จ {uploaded['added']:,} จาก {uploaded['rows']:,} แถว")
+            for col, (rule, label) in zip(st.columns(len(ingest.RULES)), ingest.RULES.items()):
+                col.metric(label, f"{uploaded['counts'][rule]:,} แถว")
+            if sum(uploaded['counts'].values()):
+                st.download_button("ดาวน์โหลดแถวที่ไม่ผ่านเกณฑ์", uploaded['rejects'],
+                                   file_name="upload_rejects.csv", mime="text/csv")
+
     with st.expander("🗑️  ลบข้อมูลที่ไม่ต้องการ"):
-        st.dataframe(df, use_container_width=True)
-        delete_idx = st.number_input("ระบุเลขลำดับที่ต้องการลบ", min_value=0, max_value=len(df)-1, step=1)
-        if st.button("ยืนยันการลบ"):
-            df = df.drop(df.index[delete_idx])
-            df.to_csv('sales_data.csv', index=False)
-            st.warning("ลบข้อมูลเรียบร้อยแล้ว")
-            st.rerun()
+        # Row numbers the user typed come from the previous run; if a compaction
+        # renumbered the rows since, make them look again before deleting.
+        seen_generation = st.session_state.get('delete_generation', generation)
+        st.session_state['delete_generation'] = generation
+        renumbered = seen_generation != generation
+        if renumbered:
+            st.warning("เลขแถวเปลี่ยนไปหลังการรวมไฟล์ (Compact) กรุณาตรวจสอบแถวที่จะลบอีกครั้ง")
+        mode = st.radio("เลือกแถวที่ต้องการลบ", ["ตามเลขแถว", "ตามเงื่อนไข"], horizontal=True)
+        if mode == "ตามเลขแถว":
+            delete_idx = st.number_input("ระบุเลขแถวที่ต้องการลบ", min_value=0, step=1)
+            targets = df.index.intersection([delete_idx])
+            if targets.empty:
+                st.info("ไม่พบแถวนี้ (อาจถูกลบไปแล้ว)")
+        else:
+            f1, f2 = st.columns([1, 2])
+            del_col  = f1.selectbox("คอลัมน์", COLUMNS)
+            del_null = f1.checkbox("รวมแถวที่ค่าว่างหรืออ่านค่าไม่ได้")
+            col = df[del_col]
+            # Only the low-cardinality columns list their values; dates, prices
+            # and IDs take a range or typed IDs instead of a huge option list.
+            if del_col in DELETE_VALUE_COLUMNS:
+                del_vals = f2.multiselect("ค่าที่ต้องการลบ", sorted(col.dropna().unique()))
+                mask = col.isin(del_vals)
+            elif del_col == "Product_ID":
+                del_ids = f2.text_input("รหัสสินค้า (คั่นหลายรหัสด้วย ,)")
+                mask = col.isin([i.strip() for i in del_ids.split(',') if i.strip()])
+            else:
+                r1, r2 = f2.columns(2)
+                if del_col == "Date":
+                    lo, hi = (None if d is None else pd.Timestamp(d) for d in (
+                        r1.date_input("ตั้งแต่วันที่", value=None, key="del_date_lo"),
+                        r2.date_input("ถึงวันที่", value=None, key="del_date_hi")))
+                    values = col.dt.normalize()
+                else:
+                    step = 1 if del_col == "Quantity" else 0.01
+                    lo = r1.number_input("ตั้งแต่", value=None, step=step, key=f"del_{del_col}_lo")
+                    hi = r2.number_input("ถึง", value=None, step=step, key=f"del_{del_col}_hi")
+                    values = col
+                mask = pd.Series(lo is not None or hi is not None, index=df.index)
+                if lo is not None:
+                    mask &= (values >= lo).fillna(False).astype(bool)
+                if hi is not None:
+                    mask &= (values <= hi).fillna(False).astype(bool)
+            if del_null:
+                mask |= col.isna()
+            targets = df.index[mask]
+            st.caption(f"ตรงเงื่อนไข {len(targets)} แถว")
+        if not targets.empty:
+            viewer.paged_table(df.loc[targets], "delete_view", fmt=schema.display)
+
+        confirmed = st.button("ยืนยันการลบ", disabled=targets.empty or renumbered)
+        if confirmed and not renumbered:  # a click made before the compaction is dropped
+            try:
+                store.delete_rows(targets, generation)
+            except store.RowIdsChanged:
+                st.error("เลขแถวเปลี่ยนไประหว่างการลบ (มีการรวมไฟล์) ยังไม่ได้ลบข้อมูล กรุณาตรวจสอบอีกครั้ง")
+            else:
+                st.warning(f"ลบข้อมูลเรียบร้อยแล้ว {len(targets)} แถว")
+                st.rerun()
+
+        pending = store.pending_deletes()
+        if pending:
+            st.caption(f"มีแถวที่ลบแล้วรอรวมเข้าไฟล์หลัก {pending} แถว")
+            if st.button("รวมไฟล์ (Compact) ตอนนี้"):
+                store.compact()
+                st.rerun()
 
 # ── Section 1: Quality Check ──────────────────────────────────────────────────
 elif menu == "1. ตรวจสอบคุณภาพข้อมูล":
     st.subheader("ตรวจสอบคุณภาพข้อมูล")
 
     if st.button("เริ่มตรวจสอบ"):
+        with perf.stage("quality", rows=len(df)):
+            report = quality.profile(df)
+
         # Missing values
         st.markdown("**Missing Values**")
-        null_rows = df[df.isnull().any(axis=1)]
-        if not null_rows.empty:
-            st.error(f"พบข้อมูลไม่สมบูรณ์ {len(null_rows)} แถว")
-            st.dataframe(null_rows, use_container_width=True)
+        if report["null_rows"]:
+            st.error(f"พบข้อมูลไม่สมบูรณ์ {report['null_rows']} แถว")
+            st.dataframe(report["null_sample"], use_container_width=True)
         else:
             st.success("ข้อมูลทุกแถวครบถ้วน")
 
@@ -344,79 +261,93 @@ elif menu == "1. ตรวจสอบคุณภาพข้อมูล":
 
         # Duplicates
         st.markdown("**ข้อมูลซ้ำ (Duplicates)**")
-        dup_rows = df[df.duplicated(keep=False)]
-        if not dup_rows.empty:
-            st.warning(f"พบข้อมูลซ้ำ {len(df[df.duplicated()])} รายการ")
-            st.dataframe(dup_rows.sort_values(by=list(df.columns)), use_container_width=True)
+        if report["duplicate_rows"]:
+            st.warning(f"พบข้อมูลซ้ำ {report['duplicate_rows']} รายการ ({report['duplicate_groups']} กลุ่ม)")
+            st.dataframe(report["duplicate_sample"], use_container_width=True)
         else:
             st.success("ไม่พบข้อมูลซ้ำ")
 
         st.divider()
 
-        # Data types
-        st.markdown("**ชนิดข้อมูลรายช่อง**")
-        def check_type(v): return type(v).__name__
-        st.dataframe(df.applymap(check_type), use_container_width=True)
-        st.info("หากคอลัมน์ตัวเลขแสดงผลเป็น `str` แสดงว่าแถวนั้นมีชนิดข้อมูลผิดพลาด")
+        # Per-column profile
+        st.markdown("**สรุปคุณภาพรายคอลัมน์**")
+        st.dataframe(report["columns"], use_container_width=True)
+        for label, rows in report["invalid_samples"].items():
+            with st.expander(f"ตัวอย่างแถวที่ผิดพลาด — {label}"):
+                st.dataframe(rows, use_container_width=True)
+        st.caption(f"แสดงตัวอย่างไม่เกิน {quality.SAMPLE_ROWS} แถวต่อหัวข้อ จากทั้งหมด {report['rows']:,} แถว")
 
 # ── Section 2: Data Cleaning ──────────────────────────────────────────────────
 elif menu == "2. ทำความสะอาดข้อมูล":
     st.subheader("ทำความสะอาดข้อมูล")
     st.info("เกณฑ์: ลบซ้ำ · กรองค่าติดลบ · แปลงรูปแบบวันที่")
 
+    full_rebuild = st.checkbox("ประมวลผลใหม่ทั้งหมด (ไม่ใช้ผลครั้งก่อน)")
     if st.button("เริ่มทำความสะอาด"):
-        df_before = df.copy()
-
-        dup_rows          = df_before[df_before.duplicated()]
-        df_clean          = df_before.drop_duplicates()
-        wrong_fmt         = df_clean[(df_clean['Quantity'] <= 0) | (df_clean['Unit Price'] <= 0)]
-        df_clean          = df_clean[(df_clean['Quantity'] > 0) & (df_clean['Unit Price'] > 0)]
-        invalid_date_rows = df_clean[pd.to_datetime(df_clean['Date'], errors='coerce').isna()]
-        df_clean['Date']  = pd.to_datetime(df_clean['Date'], errors='coerce')
-        df_clean          = df_clean.dropna(subset=['Date'])
-
-        st.session_state['df_clean'] = df_clean
-        st.success("ทำความสะอาดเสร็จสิ้น")
+        # Only the small summary is kept per session; the data itself is shared.
+        with perf.stage("clean") as stage:
+            st.session_state['clean_result'] = cleaning.run(full=full_rebuild)
+            stage.rows = st.session_state['clean_result']['processed_rows']
+
+    result = st.session_state.get('clean_result')
+    if result:
+        if result['mode'] == 'current':
+            st.success("ข้อมูลที่ทำความสะอาดแล้วเป็นปัจจุบัน · ไม่มีแถวที่ต้องประมวลผล")
+        elif result['mode'] == 'incremental':
+            st.success(f"ทำความสะอาดเสร็จสิ้น · ประมวลผลเฉพาะแถวใหม่ {result['processed_rows']:,} แถว")
+        else:
+            st.success(f"ทำความสะอาดเสร็จสิ้น · ประมวลผลใหม่ทั้งหมด {result['processed_rows']:,} แถว")
 
-        c1, c2, c3 = st.columns(3)
-        c1.metric("ข้อมูลซ้ำที่ลบ",         f"{len(dup_rows)} แถว")
-        c2.metric("ข้อมูลผิดรูปแบบที่ลบ",   f"{len(wrong_fmt)} แถว")
-        c3.metric("วันที่ผิดพลาดที่ลบ",      f"{len(invalid_date_rows)} แถว")
+        for col, (rule, label) in zip(st.columns(3), cleaning.RULES.items()):
+            col.metric(label, f"{result['counts'][rule]} แถว")
 
         with st.expander("รายละเอียดรายการที่ถูกลบ"):
-            if not dup_rows.empty:
-                st.markdown("**ข้อมูลซ้ำ:**"); st.dataframe(dup_rows, use_container_width=True)
-            if not wrong_fmt.empty:
-                st.markdown("**จำนวน/ราคาติดลบ:**"); st.dataframe(wrong_fmt, use_container_width=True)
-            if not invalid_date_rows.empty:
-                st.markdown("**วันที่ผิดรูปแบบ:**"); st.dataframe(invalid_date_rows, use_container_width=True)
+            samples = cleaning.reject_samples()
+            if 'duplicate' in samples:
+                st.markdown("**ข้อมูลซ้ำ:**"); st.dataframe(samples['duplicate'], use_container_width=True)
+            if 'non_positive' in samples:
+                st.markdown("**จำนวน/ราคาติดลบ:**"); st.dataframe(samples['non_positive'], use_container_width=True)
+            if 'invalid_date' in samples:
+                st.markdown("**วันที่ผิดรูปแบบ:**"); st.dataframe(samples['invalid_date'], use_container_width=True)
+            st.caption(f"แสดงไม่เกิน {cleaning.SAMPLE_ROWS} แถวต่อเกณฑ์ · รายการทั้งหมดอยู่ในไฟล์ {cleaning.REJECTS_FILE}")
 
         st.markdown("**ข้อมูลที่พร้อมใช้งาน**")
-        st.dataframe(df_clean, use_container_width=True)
+        with perf.stage("clean page"):
+            viewer.paged_store(cleaning.clean_store, "clean_view")
 
 # ── Section 3: Analysis ───────────────────────────────────────────────────────
 elif menu == "3. วิเคราะห์ข้อมูล":
     st.subheader("วิเคราะห์ข้อมูลเพื่อหาข้อสรุปเชิงธุรกิจ")
 
-    if 'df_clean' in st.session_state:
-        data = st.session_state['df_clean'].copy()
-        data['Total_Sales'] = data['Quantity'] * data['Unit Price']
+    report, cube, filters = filtered_cube("analysis")
+
+    if not cube.empty:
+        if report and not filters:
+            monthly_sales, top_products, region_sales = (
+                report['monthly_sales'], report['top_products'], report['region_sales'])
+            st.caption(f"รายงานที่คำนวณไว้ล่วงหน้า · สร้างเมื่อ {report['manifest']['created']}")
+        else:
+            sketch = approx_sketch(filters)
+            with perf.stage("analysis", rows=len(cube)):
+                monthly_sales = rollup.monthly_sales(cube)
+                top_products  = sketches.top_products(sketch) if sketch else rollup.top_products(cube)
+                region_sales  = rollup.region_sales(cube)
+            if sketch:
+                distinct = sketches.distinct_counts(sketch)
+                st.caption(f"อันดับสินค้าเป็นค่าประมาณ · สินค้าไม่ซ้ำประมาณ {distinct['Product Name']:,} รายการ "
+                           f"({distinct['Product_ID']:,} รหัส)")
 
         st.markdown("**ยอดขายรวมต่อเดือน**")
-        data['Month']    = data['Date'].dt.to_period('M').astype(str)
-        monthly_sales    = data.groupby('Month')['Total_Sales'].sum().reset_index()
         st.table(monthly_sales)
 
         st.divider()
 
         st.markdown("**สินค้าขายดีที่สุด 5 อันดับ**")
-        top_products = data.groupby('Product Name')['Quantity'].sum().sort_values(ascending=False).head(5).reset_index()
         st.table(top_products)
 
         st.divider()
 
         st.markdown("**ยอดขายตามภูมิภาค**")
-        region_sales = data.groupby('Region')['Total_Sales'].sum().reset_index()
         st.table(region_sales)
 
         st.divider()
@@ -427,8 +358,10 @@ elif menu == "3. วิเคราะห์ข้อมูล":
 - ควรทำโปรโมชั่นพ่วงสำหรับ **{best_product}** (สินค้าขายดีอันดับ 1)  
 - ทุ่มงบโฆษณาในภูมิภาค **{best_region}** (ยอดซื้อสูงสุด)  
 - เตรียมสต็อกล่วงหน้า 1 เดือนตามแนวโน้มรายเดือน""")
+    elif filters:
+        st.warning("ไม่พบข้อมูลตามเงื่อนไขที่เลือก")
     else:
-        st.warning("กรุณาดำเนินการ 'ทำความสะอาดข้อมูล' ในขั้นตอนที่ 2 ก่อน")
+        st.warning("ยังไม่มีข้อมูลที่ผ่านเกณฑ์การทำความสะอาด")
 
 # ── Section 4: Security ───────────────────────────────────────────────────────
 elif menu == "4. ความปลอดภัยข้อมูล":
@@ -455,63 +388,69 @@ elif menu == "4. ความปลอดภัยข้อมูล":
 elif menu == "5. การแสดงผลข้อมูล (Visualization)":
     st.subheader("การแสดงผลข้อมูล")
 
-    if 'df_clean' in st.session_state:
-        data = st.session_state['df_clean'].copy()
-        data['Total_Sales'] = data['Quantity'] * data['Unit Price']
-        data['Month']       = data['Date'].dt.to_period('M').astype(str)
+    report, cube, filters = filtered_cube("visual")
+
+    precomputed = report is not None and not filters
+    if not cube.empty and not precomputed:
+        with perf.stage("import charts"):
+            import charts  # matplotlib is only imported when a chart is drawn live
+
+    if not cube.empty:
+        if precomputed:
+            st.caption(f"รายงานที่คำนวณไว้ล่วงหน้า · สร้างเมื่อ {report['manifest']['created']}")
 
         # ── Line chart ────────────────────────────────────────────────────────
         st.markdown("**แนวโน้มยอดขายรายเดือน**")
-        monthly_trend = data.groupby('Month')['Total_Sales'].sum().reset_index()
-
-        fig1, ax1 = plt.subplots(figsize=(10, 4))
-        ax1.plot(monthly_trend['Month'], monthly_trend['Total_Sales'],
-                 color=PALETTE[0], linewidth=2.5, marker='o',
-                 markersize=7, markerfacecolor='#FAF7F4', markeredgewidth=2.5,
-                 markeredgecolor=PALETTE[0])
-        ax1.fill_between(monthly_trend['Month'], monthly_trend['Total_Sales'],
-                         alpha=0.12, color=PALETTE[0])
-        ax1.set_title("Monthly Sales Trend", loc='left', color='#2C2418')
-        ax1.set_ylabel("Sales (Baht)", labelpad=12)
-        ax1.set_xlabel("")
-        ax1.yaxis.set_major_formatter(mpl.ticker.FuncFormatter(lambda x, _: f"{x:,.0f}"))
-        fig1.patch.set_facecolor('#FAF7F4')
-        ax1.set_facecolor('#FAF7F4')
-        plt.tight_layout(pad=1.5)
-        st.pyplot(fig1, use_container_width=True)
+        if precomputed:
+            monthly_chart = report['monthly_trend']
+        else:
+            monthly_trend = rollup.monthly_sales(cube)
+            with perf.stage("chart: monthly", rows=len(monthly_trend)):
+                monthly_chart = charts.monthly_trend(monthly_trend)
+        st.image(monthly_chart, use_container_width=True)
 
         st.divider()
 
         # ── Bar chart ─────────────────────────────────────────────────────────
         st.markdown("**ยอดขายตามภูมิภาค**")
-        region_comp = data.groupby('Region')['Total_Sales'].sum().sort_values(ascending=False).reset_index()
-
-        fig2, ax2 = plt.subplots(figsize=(8, 4))
-        bar_colors = [PALETTE[1]] + [PALETTE[0]] * (len(region_comp) - 1)
-        bars = ax2.bar(region_comp['Region'], region_comp['Total_Sales'],
-                       color=bar_colors, width=0.52, zorder=3,
-                       edgecolor='#FAF7F4', linewidth=0.8)
-        ax2.set_title("Sales by Region", loc='left', color='#2C2418')
-        ax2.set_ylabel("Total Sales (Baht)", labelpad=12)
-        ax2.set_xlabel("")
-        ax2.yaxis.set_major_formatter(mpl.ticker.FuncFormatter(lambda x, _: f"{x:,.0f}"))
-        for bar in bars:
-            ax2.text(bar.get_x() + bar.get_width() / 2, bar.get_height() * 1.02,
-                     f"{bar.get_height():,.0f}", ha='center', va='bottom',
-                     fontsize=8.5, color='#7A6E62', fontweight='600')
-        fig2.patch.set_facecolor('#FAF7F4')
-        ax2.set_facecolor('#FAF7F4')
-        plt.tight_layout(pad=1.5)
-        st.pyplot(fig2, use_container_width=True)
+        region_sales = report['region_sales'] if precomputed else rollup.region_sales(cube)
+        region_comp  = region_sales.sort_values('Total_Sales', ascending=False, ignore_index=True)
+
+        if precomputed:
+            region_chart = report['region_bars']
+        else:
+            with perf.stage("chart: regions", rows=len(region_comp)):
+                region_chart = charts.region_bars(region_comp)
+        st.image(region_chart, use_container_width=True)
 
         st.divider()
 
         best_region  = region_comp.loc[0, 'Region']
-        best_product = data.groupby('Product Name')['Quantity'].sum().idxmax()
+        sketch = None if precomputed else approx_sketch(filters)
+        top_products = (report['top_products'] if precomputed
+                        else sketches.top_products(sketch, 1) if sketch else rollup.top_products(cube, 1))
+        best_product = top_products.loc[0, 'Product Name']
         st.success(f"""**Executive Summary**  
 - แนวโน้มรายเดือน: วิเคราะห์จากกราฟเส้นด้านบน  
 - ภูมิภาคหลัก: **{best_region}** มียอดขายสูงสุด (แท่งสีเขียว)  
 - แผนงานถัดไป: จัดโปรโมชั่น **{best_product}** ในช่วง Peak Month""")
+    elif filters:
+        st.warning("ไม่พบข้อมูลตามเงื่อนไขที่เลือก")
     else:
-        st.warning("กรุณาดำเนินการ 'ทำความสะอาดข้อมูล' ในขั้นตอนที่ 2 ก่อน")
+        st.warning("ยังไม่มีข้อมูลที่ผ่านเกณฑ์การทำความสะอาด")
         
+
+# ── Admin: performance panel ──────────────────────────────────────────────────
+# Drawn last so it includes the stages of this run. Enabled with SALES_PERF=1.
+if perf.ENABLED:
+    with st.sidebar.expander("ประสิทธิภาพระบบ (Admin)"):
+        records, totals = perf.snapshot()
+        if records:
+            st.markdown("**ขั้นตอนล่าสุด**")
+            st.dataframe(pd.DataFrame(records).drop(columns=['ts']).head(30), use_container_width=True)
+            st.markdown("**สะสมตั้งแต่เริ่มระบบ**")
+            st.dataframe(pd.DataFrame.from_dict(totals, orient='index').round(3), use_container_width=True)
+        else:
+            st.caption("ยังไม่มีข้อมูลการวัด")
+        if perf.METRICS_FILE:
+            st.caption(f"Prometheus: {perf.METRICS_FILE}")
@@ -0,0 +1,149 @@
+import argparse
+import importlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+# Nothing that imports store may be imported here: it reads SALES_STORE on import.
+import generate_data
+
+BACKENDS = ['csv', 'arrow', 'sqlite']
+
+
+class Stages:
+    """Times each stage and, with ``trace``, its peak traced allocation."""
+
+    def __init__(self, trace=True):
+        self.trace = trace
+        self.results = []
+
+    def run(self, name, func, rows=lambda result: None):
+        if self.trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            result = func()
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if self.trace else None
+            tracemalloc.stop()
+        self.results.append({
+            "stage": name,
+            "ms": round(elapsed * 1000, 1),
+            "rows": rows(result),
+            "peak_mb": None if peak is None else round(peak / 1024 / 1024, 1),
+        })
+        return result
+
+
+def git_revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def bench(workdir, backend, trace=True):
+    """Run every dashboard stage headless against ``workdir``/sales_data.csv.
+
+    The app's modules keep their files relative to the working directory,
+    so they are imported only after moving into ``workdir``.
+    """
+    os.chdir(workdir)
+    os.environ['SALES_STORE'] = backend
+    stages = Stages(trace)
+    store = importlib.import_module('store')
+    if backend != 'csv':
+        stages.run(f"migrate ({backend})", lambda: store.migrate_csv(target=store.get_store()), rows=lambda n: n)
+    cleaning = importlib.import_module('cleaning')
+    quality = importlib.import_module('quality')
+    rollup = importlib.import_module('rollup')
+    slicing = importlib.import_module('slicing')
+
+    # Section 1
+    frame = stages.run("load", store.load_data, rows=len)
+    stages.run("load (cached)", store.load_data, rows=len)
+    stages.run("quality", lambda: quality.profile(frame), rows=lambda report: report['rows'])
+    frame = None  # let the next stages run without the raw frame held
+    store.frame_cache.invalidate()
+
+    # Section 2
+    stages.run("clean (full)", lambda: cleaning.run(full=True), rows=lambda result: result['processed_rows'])
+    stages.run("read clean", cleaning.read_clean, rows=len)
+
+    # Section 3
+    cube = stages.run("rollup load", cleaning.clean_rollup, rows=len)
+    stages.run("analysis", lambda: (rollup.monthly_sales(cube), rollup.top_products(cube),
+                                    rollup.region_sales(cube)), rows=lambda tables: len(cube))
+    months = sorted(cube['Month'].unique())
+    middle = {'start': months[len(months) // 4] + '-01', 'end': months[3 * len(months) // 4] + '-28',
+              'regions': ('North',)}
+    stages.run("filtered rollup", lambda: slicing.filtered_rollup(**middle), rows=lambda part: int(part['Rows'].sum()))
+
+    # Section 5
+    charts = stages.run("import charts", lambda: importlib.import_module('charts'))
+    monthly = rollup.monthly_sales(cube)
+    regions = rollup.region_sales(cube).sort_values('Total_Sales', ascending=False, ignore_index=True)
+    stages.run("render charts", lambda: (charts.monthly_trend(monthly), charts.region_bars(regions)),
+               rows=lambda images: len(monthly) + len(regions))
+    stages.run("render charts (cached)", lambda: (charts.monthly_trend(monthly), charts.region_bars(regions)),
+               rows=lambda images: len(monthly) + len(regions))
+    return stages.results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time and memory-profile every dashboard stage outside Streamlit")
+    parser.add_argument('--rows', type=float, default=1e5, help="synthetic rows to generate, e.g. 1e6")
+    parser.add_argument('--dirty', type=float, default=0.05, help="share of dirty rows (0-1)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--csv', help="benchmark this CSV instead of generating one")
+    parser.add_argument('--store', choices=BACKENDS, default='csv')
+    parser.add_argument('--no-trace', action='store_true', help="skip tracemalloc, for timings without its overhead")
+    parser.add_argument('--out', help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    home = os.getcwd()
+    out = os.path.abspath(args.out) if args.out else None
+    workdir = tempfile.mkdtemp(prefix='sales_bench_')
+    data = os.path.join(workdir, 'sales_data.csv')
+    try:
+        if args.csv:
+            shutil.copy(args.csv, data)
+            dirty = None
+        else:
+            start = time.perf_counter()
+            dirty = generate_data.generate(data, int(args.rows), args.dirty, args.seed)
+            print(f"generated {int(args.rows):,} rows in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        results = bench(workdir, args.store, trace=not args.no_trace)
+    finally:
+        os.chdir(home)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "store": args.store,
+        "source": args.csv or "synthetic",
+        "rows": int(args.rows) if not args.csv else None,
+        "dirty_share": None if args.csv else args.dirty,
+        "dirty_rows": dirty,
+        "traced": not args.no_trace,
+        "stages": results,
+        "total_ms": round(sum(r['ms'] for r in results), 1),
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if out:
+        with open(out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
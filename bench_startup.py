@@ -0,0 +1,65 @@
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+
+APP_FILE = 'app.py'
+STARTUP_TARGET_MS = 1000
+# Modules that must not be imported until a page actually needs them.
+DEFERRED_MODULES = ['matplotlib', 'seaborn']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000,
+                  "loaded": [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def startup_imports(app_file=APP_FILE):
+    """Modules app.py imports at top level, i.e. on every cold start."""
+    with open(app_file, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def measure(modules, runs):
+    probe = PROBE.format(modules=modules, deferred=DEFERRED_MODULES)
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time app.py's startup imports in fresh interpreters")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--target-ms', type=float, default=STARTUP_TARGET_MS)
+    args = parser.parse_args()
+
+    modules = startup_imports()
+    results = measure(modules, args.runs)
+    median = statistics.median(r['ms'] for r in results)
+    loaded = sorted({m for r in results for m in r['loaded']})
+    report = {
+        "modules": modules,
+        "runs_ms": [round(r['ms'], 1) for r in results],
+        "median_ms": round(median, 1),
+        "target_ms": args.target_ms,
+        "deferred_loaded": loaded,
+        "ok": median <= args.target_ms and not loaded,
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(0 if report['ok'] else 1)
@@ -0,0 +1,154 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import matplotlib as mpl
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
+
+import perf
+
+# ── Matplotlib style ──────────────────────────────────────────────────────────
+PALETTE = ["#B35C2A", "#5C8C6E", "#C4973A", "#A83232", "#7A6E8C", "#4A7080"]
+STYLE = {
+    "font.family": "sans-serif",
+    "font.sans-serif": ["DM Sans", "Helvetica Neue", "Arial"],
+    "axes.spines.top": False,
+    "axes.spines.right": False,
+    "axes.spines.left": False,
+    "axes.spines.bottom": True,
+    "axes.grid": True,
+    "grid.color": "#DDD5C8",
+    "grid.linewidth": 0.7,
+    "grid.alpha": 0.7,
+    "axes.facecolor": "#FAF7F4",
+    "figure.facecolor": "#FAF7F4",
+    "axes.labelcolor": "#7A6E62",
+    "xtick.color": "#7A6E62",
+    "ytick.color": "#7A6E62",
+    "xtick.labelsize": 9,
+    "ytick.labelsize": 9,
+    "axes.titlesize": 12,
+    "axes.titleweight": "600",
+    "axes.titlepad": 16,
+    "axes.edgecolor": "#DDD5C8",
+    "figure.dpi": 120,
+}
+mpl.rcParams.update(STYLE)
+STYLE_DIGEST = hashlib.blake2b(repr((sorted(STYLE.items()), PALETTE)).encode(), digest_size=16).hexdigest()
+
+baht = FuncFormatter(lambda x, _: f"{x:,.0f}")
+
+
+# ── Render cache ─────────────────────────────────────────────────────────────
+class RenderCache:
+    """LRU of rendered chart bytes keyed by a digest of what was plotted."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+CHART_CACHE_ENTRIES = int(os.environ.get('SALES_CHART_CACHE_ENTRIES', '64'))
+render_cache = RenderCache(CHART_CACHE_ENTRIES)
+perf.watch_cache('charts', render_cache)
+
+
+def content_key(kind, fmt, *series):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{kind}\0{fmt}\0{STYLE_DIGEST}".encode())
+    for values in series:
+        digest.update('\x1f'.join(map(repr, values)).encode())
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+def render(kind, draw, *series, figsize, fmt='png'):
+    """Bytes of the chart ``draw(fig, *series)``, from the cache when possible.
+
+    Figures are built with matplotlib.figure.Figure rather than pyplot, so
+    nothing is registered with pyplot's global figure manager; the figure is
+    still cleared once it has been saved.
+    """
+    key = content_key(kind, fmt, *series)
+    data = render_cache.get(key)
+    if data is None:
+        fig = Figure(figsize=figsize)
+        try:
+            draw(fig, *series)
+            buf = io.BytesIO()
+            fig.savefig(buf, format=fmt, bbox_inches='tight')
+        finally:
+            fig.clear()
+        data = buf.getvalue()
+        render_cache.put(key, data)
+    return data
+
+
+# ── Charts ───────────────────────────────────────────────────────────────────
+def _monthly_trend(fig, months, sales):
+    ax = fig.subplots()
+    ax.plot(months, sales,
+            color=PALETTE[0], linewidth=2.5, marker='o',
+            markersize=7, markerfacecolor='#FAF7F4', markeredgewidth=2.5,
+            markeredgecolor=PALETTE[0])
+    ax.fill_between(months, sales, alpha=0.12, color=PALETTE[0])
+    ax.set_title("Monthly Sales Trend", loc='left', color='#2C2418')
+    ax.set_ylabel("Sales (Baht)", labelpad=12)
+    ax.set_xlabel("")
+    ax.yaxis.set_major_formatter(baht)
+    fig.patch.set_facecolor('#FAF7F4')
+    ax.set_facecolor('#FAF7F4')
+    fig.tight_layout(pad=1.5)
+
+
+def _region_bars(fig, regions, sales):
+    ax = fig.subplots()
+    bar_colors = [PALETTE[1]] + [PALETTE[0]] * (len(regions) - 1)
+    bars = ax.bar(regions, sales,
+                  color=bar_colors, width=0.52, zorder=3,
+                  edgecolor='#FAF7F4', linewidth=0.8)
+    ax.set_title("Sales by Region", loc='left', color='#2C2418')
+    ax.set_ylabel("Total Sales (Baht)", labelpad=12)
+    ax.set_xlabel("")
+    ax.yaxis.set_major_formatter(baht)
+    for bar in bars:
+        ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height() * 1.02,
+                f"{bar.get_height():,.0f}", ha='center', va='bottom',
+                fontsize=8.5, color='#7A6E62', fontweight='600')
+    fig.patch.set_facecolor('#FAF7F4')
+    ax.set_facecolor('#FAF7F4')
+    fig.tight_layout(pad=1.5)
+
+
+def monthly_trend(monthly, fmt='png'):
+    """Line chart of ``monthly`` (Month, Total_Sales)."""
+    return render('monthly_trend', _monthly_trend, list(monthly['Month']),
+                  list(monthly['Total_Sales']), figsize=(10, 4), fmt=fmt)
+
+
+def region_bars(region_comp, fmt='png'):
+    """Bar chart of ``region_comp`` (Region, Total_Sales), best region first."""
+    return render('region_bars', _region_bars, list(region_comp['Region']),
+                  list(region_comp['Total_Sales']), figsize=(8, 4), fmt=fmt)
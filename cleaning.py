@@ -0,0 +1,384 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import perf
+import rollup
+import schema
+import sketches
+import store
+
+CLEAN_FILE = 'sales_clean.arrow'
+CLEAN_DB = 'sales_clean.db'
+REJECTS_FILE = 'sales_rejects.csv'
+CHECKPOINT_FILE = 'sales_clean.ckpt.json'
+# Bump when the cleaned rows or the row digests change, so older checkpoints force a full run.
+CHECKPOINT_FORMAT = 3
+DIGESTS_DIR = 'sales_clean.digests'
+SAMPLE_ROWS = 50
+
+# Rule keys in the order they are applied, with the labels Section 2 shows.
+RULES = {
+    "duplicate": "ข้อมูลซ้ำที่ลบ",
+    "non_positive": "ข้อมูลผิดรูปแบบที่ลบ",
+    "invalid_date": "วันที่ผิดพลาดที่ลบ",
+}
+
+CLEAN_SCHEMA = pa.schema([
+    ("Date", pa.timestamp('ns')),
+    ("Product_ID", pa.string()),
+    ("Product Name", pa.string()),
+    ("Category", pa.string()),
+    ("Quantity", pa.float64()),
+    ("Unit Price", pa.float64()),
+    ("Region", pa.string()),
+])
+
+
+# ── Duplicate detection across chunks ────────────────────────────────────────
+def row_digests(chunk):
+    """One 64-bit digest per row, equal for equal rows whatever backend read them.
+
+    Like quality.profile, numbers are compared parsed (25000 and 25000.00
+    collide) and values that do not parse by their text (abc and xyz do not).
+    """
+    columns = {}
+    for name in store.COLUMNS:
+        if name not in store.NUMERIC_COLUMNS:
+            columns[name] = chunk[name]
+            continue
+        values = parsed_number(chunk, name)
+        raw = schema.reject_column(name)
+        columns[name] = values
+        text = chunk[raw] if raw in chunk else chunk[name]
+        columns[raw] = text.astype(object).where(values.isna())
+    normalized = pd.DataFrame(columns)
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+
+class DigestSet:
+    """Set of 64-bit row digests stored as sorted numpy runs (8 bytes per row).
+
+    Runs are merged whenever a run is at least as large as the one before
+    it, so there are only O(log n) runs to binary-search per lookup. On
+    disk each run is one ``.npy`` file, merged by the same rule, so a save
+    writes the new digests and not the whole set.
+    """
+
+    def __init__(self, runs=(), files=()):
+        self.runs = [np.asarray(run, dtype=np.uint64) for run in runs if len(run)]
+        self.files = list(files)  # run files this set was loaded from, oldest first
+        self.added = []  # digests added since, not saved yet
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def add_new(self, digests):
+        """Add ``digests``; returns a mask of the ones not seen before.
+
+        Within ``digests`` only the first occurrence of a value counts as new.
+        """
+        digests = np.asarray(digests, dtype=np.uint64)
+        _, first = np.unique(digests, return_index=True)
+        fresh = np.zeros(len(digests), dtype=bool)
+        fresh[first] = True
+        for run in self.runs:
+            pos = np.minimum(np.searchsorted(run, digests), len(run) - 1)
+            fresh &= run[pos] != digests
+        if fresh.any():
+            self.added.append(np.sort(digests[fresh]))
+            self.runs.append(self.added[-1])
+            while len(self.runs) > 1 and len(self.runs[-2]) <= len(self.runs[-1]):
+                last = self.runs.pop()
+                self.runs[-1] = np.sort(np.concatenate([self.runs[-1], last]))
+        return fresh
+
+    def save(self, directory):
+        """Write the digests added since loading as a new run file; returns the run files.
+
+        Files no larger than the new run are merged into it first. Files
+        that drop out are left in place until the checkpoint stops naming
+        them (see prune_digests).
+        """
+        if not self.added:
+            return self.files
+        os.makedirs(directory, exist_ok=True)
+        run, files = np.sort(np.concatenate(self.added)), list(self.files)
+        while files:
+            last = np.load(os.path.join(directory, files[-1]), mmap_mode='r')
+            if len(last) > len(run):
+                break
+            run = np.sort(np.concatenate([last, run]))
+            files.pop()
+        existing = [int(name.split('.')[0]) for name in os.listdir(directory) if name.endswith('.npy')]
+        name = f'{max(existing, default=-1) + 1:08d}.npy'
+        with open(os.path.join(directory, name + '.tmp'), 'wb') as f:
+            np.save(f, run)
+        os.replace(os.path.join(directory, name + '.tmp'), os.path.join(directory, name))
+        self.files, self.added = files + [name], []
+        return self.files
+
+    @classmethod
+    def load(cls, directory, files):
+        return cls([np.load(os.path.join(directory, name)) for name in files], files)
+
+
+def prune_digests(keep, directory=DIGESTS_DIR):
+    """Remove run files the checkpoint no longer names."""
+    for name in os.listdir(directory) if os.path.isdir(directory) else []:
+        if name not in keep:
+            os.remove(os.path.join(directory, name))
+
+
+# ── Rules ────────────────────────────────────────────────────────────────────
+def parsed_number(chunk, name):
+    """Column ``name`` of a raw chunk as float64, null where it is not a number."""
+    values = pd.to_numeric(chunk[name], errors='coerce').astype('float64')
+    raw = schema.reject_column(name)
+    if raw in chunk:
+        # Typed stores keep the values their column could not hold (2.5 as a quantity) as text.
+        values = values.fillna(pd.to_numeric(chunk[raw].astype(object), errors='coerce'))
+    return values
+
+
+def parse_values(chunk):
+    """Quantity and Unit Price as float64; quantities that do not fit in int64 count as malformed."""
+    qty = parsed_number(chunk, 'Quantity')
+    qty = qty.where((qty >= -schema.INT64_LIMIT) & (qty < schema.INT64_LIMIT))
+    return qty, parsed_number(chunk, 'Unit Price')
+
+
+def clean_chunks(chunks, state):
+    """Apply the cleaning rules chunk by chunk.
+
+    ``state`` carries what must persist between chunks and between runs:
+    the DigestSet under ``seen`` and the inferred ``date_format``. Yields
+    ``(clean, rejects)`` per chunk; ``rejects`` has a ``Rule`` column.
+    """
+    seen = state['seen']
+    for chunk in chunks:
+        with perf.stage("clean: duplicates", rows=len(chunk)):
+            fresh = seen.add_new(row_digests(chunk))
+            rejected = [chunk[~fresh].assign(Rule="duplicate")]
+            chunk = chunk[fresh]
+
+        with perf.stage("clean: values", rows=len(chunk)):
+            qty, price = parse_values(chunk)
+            valid = (qty > 0) & (price > 0)
+            rejected.append(chunk[~valid].assign(Rule="non_positive"))
+            chunk = chunk[valid].assign(**{'Quantity': qty[valid], 'Unit Price': price[valid]})
+
+        with perf.stage("clean: dates", rows=len(chunk)):
+            # Like a whole-column to_datetime, infer the format from the first
+            # date seen and then hold it fixed for every later chunk and run.
+            if state.get('date_format') is None:
+                state['date_format'] = schema.infer_date_format(chunk['Date'])
+            dates = pd.to_datetime(chunk['Date'], errors='coerce', format=state.get('date_format'))
+            rejected.append(chunk[dates.isna()].assign(Rule="invalid_date"))
+            chunk = chunk[dates.notna()].assign(Date=dates[dates.notna()])
+
+        yield chunk, pd.concat(rejected)
+
+
+def clean_table(frame):
+    columns = {}
+    for field in CLEAN_SCHEMA:
+        col = frame[field.name]
+        if pa.types.is_string(field.type):
+            col = col.where(col.isna(), col.astype(str))
+        columns[field.name] = pa.array(col, type=field.type, from_pandas=True)
+    return pa.Table.from_pydict(columns, schema=CLEAN_SCHEMA)
+
+
+# The cleaned dataset is itself an append-only store, so incremental runs add
+# rows and update the cached frame instead of rewriting it. Next to a SQLite
+# working store it is a SQLite table too, so filtered aggregates run as SQL.
+if store.get_store().name == store.SqliteStore.name:
+    clean_store = store.SqliteStore(CLEAN_DB, table='sales_clean', schema=CLEAN_SCHEMA, coerce=clean_table,
+                                    initial=None, index=('Date',), keep_rejects=False)
+else:
+    clean_store = store.ArrowStore(CLEAN_FILE, schema=CLEAN_SCHEMA, coerce=clean_table, initial=None,
+                                   keep_rejects=False)
+
+
+# ── Checkpoint ───────────────────────────────────────────────────────────────
+def load_checkpoint():
+    if not all(os.path.exists(p) for p in (CHECKPOINT_FILE, rollup.ROLLUP_FILE, sketches.SKETCH_FILE)):
+        return None
+    with open(CHECKPOINT_FILE) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('format') != CHECKPOINT_FORMAT:
+        return None
+    files = checkpoint.get('digests')
+    if files is None or not all(os.path.exists(os.path.join(DIGESTS_DIR, name)) for name in files):
+        return None
+    # A run that died part way has appended clean rows and rejects the checkpoint does not count.
+    if (not clean_store.exists() or not os.path.exists(REJECTS_FILE)
+            or clean_store.stored_rows() != checkpoint.get('stored_rows')
+            or os.path.getsize(REJECTS_FILE) != checkpoint.get('rejects_size')):
+        return None
+    return checkpoint
+
+
+def source_version(source):
+    """``source.version()`` in the form it takes after a JSON round trip."""
+    source.ensure()
+    return json.loads(json.dumps(source.version()))
+
+
+def save_checkpoint(checkpoint, seen):
+    # The checkpoint names its digest files, so a crash before it is written
+    # leaves the previous checkpoint with the files it names.
+    checkpoint = dict(checkpoint, digests=seen.save(DIGESTS_DIR))
+    with open(CHECKPOINT_FILE + '.tmp', 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(CHECKPOINT_FILE + '.tmp', CHECKPOINT_FILE)
+    prune_digests(checkpoint['digests'])
+
+
+# ── Pipeline ─────────────────────────────────────────────────────────────────
+def run(source=None, chunksize=store.CHUNK_ROWS, full=False):
+    """Bring the cleaned dataset up to date with ``source``.
+
+    Rows appended since the last checkpoint are cleaned, appended to the
+    cleaned store and added into the rollup cube and the sketches.
+    Anything else (deletes or edits behind the checkpoint, a compaction,
+    a run that died part way, ``full=True``) streams the whole source again. Only one chunk and the
+    digest set are ever held in memory.
+    """
+    source = source or store.get_store()
+    with store.file_lock(CHECKPOINT_FILE):
+        source.ensure()
+        version = source_version(source)
+        checkpoint = None if full else load_checkpoint()
+        # Sessions that queued on the lock behind a run find the work done.
+        if checkpoint is not None and checkpoint.get('source_version') == version:
+            return {"mode": "current", "processed_rows": 0, "counts": checkpoint['counts'],
+                    "clean_rows": checkpoint['clean_rows']}
+        incremental = checkpoint is not None and source.is_extension(checkpoint['cursor'])
+        if incremental:
+            state = {'seen': DigestSet.load(DIGESTS_DIR, checkpoint['digests']),
+                     'date_format': checkpoint['date_format']}
+            cursor = checkpoint['cursor']
+            counts = checkpoint['counts']
+            clean_rows = checkpoint['clean_rows']
+            cube = rollup.load()
+            sketch = sketches.load()
+        else:
+            state = {'seen': DigestSet(), 'date_format': None}
+            cursor = source.cursor()
+            counts = dict.fromkeys(RULES, 0)
+            clean_rows = 0
+            cube = rollup.empty()
+            sketch = sketches.empty()
+        start_row = cursor['rows']
+
+        rejects_tmp = REJECTS_FILE if incremental else REJECTS_FILE + '.tmp'
+        write_header = not (incremental and os.path.exists(REJECTS_FILE))
+        with open(rejects_tmp, 'a' if incremental else 'w', newline='', encoding='utf-8') as rejects_out:
+
+            def cleaned_tables():
+                nonlocal write_header, clean_rows, cube, sketch
+                for clean, rejects in clean_chunks(source.iter_chunks(chunksize, cursor), state):
+                    store.as_entered(rejects).rename_axis('Row_ID').to_csv(rejects_out, header=write_header)
+                    write_header = False
+                    for rule, n in rejects['Rule'].value_counts().items():
+                        counts[rule] += int(n)
+                    clean_rows += len(clean)
+                    cube = rollup.merge([cube, rollup.rollup(clean)])
+                    sketch = sketches.update(sketch, clean)
+                    yield clean
+
+            if incremental:
+                for clean in cleaned_tables():
+                    clean_store.append(clean)
+            else:
+                clean_store.reset(clean_table(clean) for clean in cleaned_tables())
+        if not incremental:
+            os.replace(rejects_tmp, REJECTS_FILE)
+        rollup.save(cube)
+        sketches.save(sketch)
+
+        save_checkpoint({'format': CHECKPOINT_FORMAT, 'cursor': cursor, 'counts': counts,
+                         'clean_rows': clean_rows, 'date_format': state['date_format'], 'source_version': version,
+                         'stored_rows': clean_store.stored_rows(), 'rejects_size': os.path.getsize(REJECTS_FILE)},
+                        state['seen'])
+
+    return {
+        "mode": "incremental" if incremental else "full",
+        "processed_rows": cursor['rows'] - start_row,
+        "counts": counts,
+        "clean_rows": clean_rows,
+    }
+
+
+def reject_samples(rejects_path=REJECTS_FILE, sample_rows=SAMPLE_ROWS):
+    """Up to ``sample_rows`` removed rows per rule, read lazily from the rejects file."""
+    samples = {rule: [] for rule in RULES}
+    if not os.path.exists(rejects_path) or os.path.getsize(rejects_path) == 0:
+        return {}
+    for chunk in pd.read_csv(rejects_path, chunksize=store.CHUNK_ROWS, dtype=str, index_col='Row_ID'):
+        for rule, rows in chunk.groupby('Rule', sort=False):
+            have = sum(len(part) for part in samples[rule])
+            if have < sample_rows:
+                samples[rule].append(rows.drop(columns='Rule').head(sample_rows - have))
+        if all(sum(len(part) for part in parts) >= sample_rows for parts in samples.values()):
+            break
+    return {rule: pd.concat(parts) for rule, parts in samples.items() if parts}
+
+
+def read_clean(columns=None):
+    return clean_store.load(columns)
+
+
+def is_current(source=None):
+    """True if the cleaned dataset already reflects every change to ``source``."""
+    source = source or store.get_store()
+    checkpoint = load_checkpoint()
+    return checkpoint is not None and checkpoint.get('source_version') == source_version(source)
+
+
+def refresh(source=None):
+    """Clean whatever changed in ``source`` since the last checkpoint, if anything."""
+    source = source or store.get_store()
+    if not is_current(source):
+        run(source)
+
+
+def clean_data(columns=None, source=None):
+    """The cleaned dataset, shared by every session in the process.
+
+    Cleaning runs only when ``source`` changed since the last checkpoint
+    (usually just the appended rows); otherwise this is a cache lookup.
+    """
+    refresh(source)
+    return read_clean(columns)
+
+
+def clean_rollup(source=None):
+    """The rollup cube of the cleaned dataset, refreshed like clean_data()."""
+    refresh(source)
+    return rollup.load()
+
+
+def clean_sketches(source=None):
+    """Top-K and distinct-count sketches of the cleaned dataset, refreshed like clean_data()."""
+    refresh(source)
+    return sketches.load()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Clean the working store without loading it into memory")
+    parser.add_argument('--chunksize', type=int, default=store.CHUNK_ROWS)
+    parser.add_argument('--full', action='store_true', help="ignore the checkpoint and rebuild")
+    args = parser.parse_args()
+
+    result = run(chunksize=args.chunksize, full=args.full)
+    print(f"{result['mode']} run over {result['processed_rows']} rows")
+    for rule in RULES:
+        print(f"{rule}: {result['counts'][rule]}")
+    print(f"clean rows: {result['clean_rows']} -> {clean_store.path}")
@@ -0,0 +1,97 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 1_000_000
+START_DATE = '2023-01-01'
+DAYS = 3 * 365
+# Prices vary around the list price (discounts, surcharges), which also keeps
+# generated rows distinct, so the only duplicates are the injected ones.
+PRICE_JITTER = 0.15
+REGIONS = ['North', 'South', 'East', 'West', 'Central']
+# (Product_ID, Product Name, Category, Unit Price)
+CATALOG = [
+    ('P001', 'Laptop', 'IT', 25000), ('P002', 'Monitor', 'IT', 6500), ('P003', 'Desk', 'Furniture', 3000),
+    ('P004', 'Chair', 'Furniture', 1500), ('P005', 'Notebook', 'IT', 25000), ('P006', 'Keyboard', 'IT', 900),
+    ('P007', 'Mouse', 'IT', 450), ('P008', 'Printer', 'IT', 4200), ('P009', 'Lamp', 'Furniture', 300),
+    ('P010', 'Bookshelf', 'Furniture', 2200), ('P011', 'Cabinet', 'Furniture', 3800), ('P012', 'Sofa', 'Furniture', 12000),
+    ('P013', 'Pen', 'Stationery', 15), ('P014', 'Paper A4', 'Stationery', 120), ('P015', 'Stapler', 'Stationery', 85),
+    ('P016', 'Whiteboard', 'Stationery', 1100), ('P017', 'Headset', 'IT', 1200), ('P018', 'Webcam', 'IT', 1600),
+    ('P019', 'Tablet', 'IT', 14000), ('P020', 'Router', 'IT', 2100),
+]
+# Each kind gets an equal share of the dirty rows.
+DIRTY_KINDS = ['duplicate', 'negative', 'invalid_date', 'blank_id']
+
+
+def popularity(n):
+    """Zipf-like weights, so a few products and regions dominate as in real sales."""
+    weights = 1 / np.arange(1, n + 1)
+    return weights / weights.sum()
+
+
+def clean_chunk(rng, rows):
+    catalog = pd.DataFrame(CATALOG, columns=['Product_ID', 'Product Name', 'Category', 'Unit Price'])
+    products = catalog.iloc[rng.choice(len(catalog), rows, p=popularity(len(catalog)))].reset_index(drop=True)
+    days = rng.integers(0, DAYS, rows)
+    return pd.DataFrame({
+        'Date': (np.datetime64(START_DATE) + days).astype(str).astype(object),
+        'Product_ID': products['Product_ID'],
+        'Product Name': products['Product Name'],
+        'Category': products['Category'],
+        'Quantity': rng.geometric(0.35, rows),
+        'Unit Price': (products['Unit Price'] * rng.uniform(1 - PRICE_JITTER, 1 + PRICE_JITTER, rows)).round(2),
+        'Region': np.asarray(REGIONS, dtype=object)[rng.choice(len(REGIONS), rows, p=popularity(len(REGIONS)))],
+    })
+
+
+def dirty(rng, frame, share):
+    """Turn about ``share`` of the rows into the kinds of bad rows cleaning removes."""
+    picked = np.flatnonzero(rng.random(len(frame)) < share)
+    kinds = rng.integers(0, len(DIRTY_KINDS), len(picked))
+    counts = {}
+    for i, kind in enumerate(DIRTY_KINDS):
+        rows = picked[kinds == i]
+        counts[kind] = len(rows)
+        if kind == 'duplicate':
+            # Copies of other rows in the same chunk; the copy stays where it lands.
+            frame.iloc[rows] = frame.iloc[rng.integers(0, len(frame), len(rows))].to_numpy()
+        elif kind == 'negative':
+            for column, part in (('Quantity', rows[::2]), ('Unit Price', rows[1::2])):
+                frame.iloc[part, frame.columns.get_loc(column)] *= -1
+        elif kind == 'invalid_date':
+            frame.iloc[rows, frame.columns.get_loc('Date')] = 'invalid_date'
+        elif kind == 'blank_id':
+            frame.iloc[rows, frame.columns.get_indexer(['Product_ID', 'Product Name'])] = None
+    return counts
+
+
+def generate(path, rows, dirty_share=0.05, seed=0, chunk_rows=CHUNK_ROWS):
+    """Write ``rows`` synthetic sales rows to ``path`` in the sales_data.csv schema.
+
+    Rows are built and written a chunk at a time, so any size fits in
+    memory. Returns how many rows of each dirty kind were written.
+    """
+    rng = np.random.default_rng(seed)
+    counts = dict.fromkeys(DIRTY_KINDS, 0)
+    with open(path, 'w', newline='', encoding='utf-8') as out:
+        for start in range(0, rows, chunk_rows):
+            frame = clean_chunk(rng, min(chunk_rows, rows - start))
+            for kind, n in dirty(rng, frame, dirty_share).items():
+                counts[kind] += n
+            frame.to_csv(out, header=start == 0, index=False)
+    return counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write a synthetic sales CSV with a share of dirty rows")
+    parser.add_argument('path', nargs='?', default='sales_synthetic.csv')
+    parser.add_argument('--rows', type=float, default=1e5, help="number of rows, e.g. 1e6")
+    parser.add_argument('--dirty', type=float, default=0.05, help="share of dirty rows (0-1)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    counts = generate(args.path, int(args.rows), args.dirty, args.seed)
+    print(f"wrote {int(args.rows):,} rows to {args.path}")
+    for kind, n in counts.items():
+        print(f"{kind}: {n:,}")
@@ -0,0 +1,166 @@
+import csv
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import cleaning
+import perf
+import schema
+import store
+from store import COLUMNS
+
+BLOCK_BYTES = 4 * 1024 * 1024
+EXCEL_BLOCK_ROWS = 100_000
+EXCEL_SUFFIXES = ('.xlsx', '.xls')
+# Rule keys in the order they are applied, with the labels Section 0 shows.
+RULES = {
+    "non_positive": "จำนวน/ราคาไม่ถูกต้อง",
+    "invalid_date": "วันที่ผิดรูปแบบ",
+    "missing_id": "ไม่มีรหัสสินค้า",
+}
+
+
+# ── Validation ───────────────────────────────────────────────────────────────
+def validate(chunk, date_format):
+    """Split raw rows into (valid, rejects) by the Section 2 rules plus a Product_ID check.
+
+    Valid rows keep their text, except Date, which is rewritten as
+    YYYY-MM-DD like rows from the entry form, so one file's date format
+    cannot make the rest of the store unparseable. ``rejects`` has a
+    ``Rule`` column.
+    """
+    rejected = []
+    qty, price = cleaning.parse_values(chunk)
+    valid = (qty > 0) & (price > 0)
+    rejected.append(chunk[~valid].assign(Rule="non_positive"))
+    chunk = chunk[valid]
+
+    dates = pd.to_datetime(chunk['Date'], errors='coerce', format=date_format)
+    rejected.append(chunk[dates.isna()].assign(Rule="invalid_date"))
+    chunk = chunk[dates.notna()].assign(Date=dates[dates.notna()].dt.strftime('%Y-%m-%d'))
+
+    has_id = chunk['Product_ID'].fillna('').str.strip() != ''
+    rejected.append(chunk[~has_id].assign(Rule="missing_id"))
+    return chunk[has_id], pd.concat(rejected)
+
+
+def validate_block(block, names, date_format):
+    """Worker: parse one block (CSV bytes or a frame) and validate it; positions are block-local."""
+    if isinstance(block, bytes) and not block.strip():
+        chunk = pd.DataFrame(columns=COLUMNS, dtype=object)
+    elif isinstance(block, bytes):
+        chunk = pd.read_csv(io.BytesIO(block), header=None, names=names, dtype=str, encoding='utf-8')
+    else:
+        chunk = block.astype(object).where(block.notna(), None)
+    chunk = chunk[COLUMNS].reset_index(drop=True)
+    valid, rejects = validate(chunk, date_format)
+    return len(chunk), valid, rejects
+
+
+# ── Splitting ────────────────────────────────────────────────────────────────
+def header_names(data):
+    """Column names from the first line of CSV ``data``, and where the rows start."""
+    end = data.find(b'\n') + 1 or len(data)
+    names = next(csv.reader([data[:end].decode('utf-8-sig')]), [])
+    return [name.strip() for name in names], end
+
+
+def csv_blocks(data, start, block_bytes=BLOCK_BYTES):
+    """Line-aligned slices of ``data`` from ``start``.
+
+    Splits at newlines only, so quoted values with embedded line breaks
+    are not supported in uploads.
+    """
+    while start < len(data):
+        end = data.find(b'\n', min(start + block_bytes, len(data)) - 1) + 1 or len(data)
+        yield data[start:end]
+        start = end
+
+
+def excel_blocks(frame, block_rows=EXCEL_BLOCK_ROWS):
+    for start in range(0, len(frame), block_rows):
+        yield frame.iloc[start:start + block_rows]
+
+
+def check_columns(names):
+    missing = [c for c in COLUMNS if c not in names]
+    if missing:
+        raise ValueError(f"ไม่พบคอลัมน์ {', '.join(missing)}")
+
+
+# ── Worker pool ──────────────────────────────────────────────────────────────
+_lock = threading.Lock()
+_pool = None
+
+
+def pool():
+    """Process pool shared by every upload; spawn keeps workers clear of the server's threads."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+# ── Upload ───────────────────────────────────────────────────────────────────
+def ingest(name, data, progress=None, target=None):
+    """Validate an uploaded CSV/Excel file and append its valid rows in one batch.
+
+    Blocks are parsed and validated in the process pool (inline when the
+    file is a single block); ``progress(done, total)`` is called as each
+    block finishes. Returns the counts and the rejected rows, indexed by
+    their 1-based row number in the file.
+    """
+    target = target or store.get_store()
+    if name.lower().endswith(EXCEL_SUFFIXES):
+        frame = pd.read_excel(io.BytesIO(data), dtype=str)  # needs openpyxl / xlrd
+        frame.columns = [str(c).strip() for c in frame.columns]
+        check_columns(frame.columns)
+        names, blocks = list(frame.columns), list(excel_blocks(frame))
+        date_format = schema.infer_date_format(frame['Date'])
+    else:
+        names, start = header_names(data)
+        check_columns(names)
+        blocks = list(csv_blocks(data, start))
+        first = next((block for block in blocks if block.strip()), None)
+        sample = pd.read_csv(io.BytesIO(first), header=None, names=names, dtype=str, nrows=1000) \
+            if first else pd.DataFrame(columns=names)
+        date_format = schema.infer_date_format(sample['Date'])
+
+    results = [None] * len(blocks)
+    with perf.stage("upload: validate") as stage:
+        if len(blocks) == 1:
+            results[0] = validate_block(blocks[0], names, date_format)
+            if progress:
+                progress(1, 1)
+        elif blocks:
+            futures = {pool().submit(validate_block, block, names, date_format): i
+                       for i, block in enumerate(blocks)}
+            for done, future in enumerate(as_completed(futures), 1):
+                results[futures[future]] = future.result()
+                if progress:
+                    progress(done, len(blocks))
+        stage.rows = sum(n for n, _, _ in results)
+
+    valid, rejects, offset = [], [], 0
+    for n, block_valid, block_rejects in results:
+        valid.append(block_valid)
+        rejects.append(block_rejects.set_axis(block_rejects.index + offset + 1))
+        offset += n
+    valid = pd.concat(valid) if valid else pd.DataFrame(columns=COLUMNS)
+    rejects = pd.concat(rejects) if rejects else pd.DataFrame(columns=COLUMNS + ['Rule'])
+
+    with perf.stage("upload: append", rows=len(valid)):
+        added = target.append(valid.reset_index(drop=True))
+    counts = rejects['Rule'].value_counts()
+    return {
+        "rows": offset,
+        "added": added,
+        "counts": {rule: int(counts.get(rule, 0)) for rule in RULES},
+        "rejects": rejects.rename_axis('Row'),
+    }
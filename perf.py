@@ -0,0 +1,148 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Off unless SALES_PERF is set; a disabled stage() is one flag check and a
+# shared no-op context manager.
+ENABLED = os.environ.get('SALES_PERF', '') not in ('', '0')
+METRICS_FILE = os.environ.get('SALES_PERF_FILE', 'sales_perf.prom')
+RECENT_STAGES = 200
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+log = logging.getLogger('sales.perf')
+if ENABLED and not log.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    log.addHandler(_handler)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+_lock = threading.Lock()
+_caches = {}  # name -> object with hits / misses counters
+recent = deque(maxlen=RECENT_STAGES)
+totals = {}  # stage -> running sums, see _record
+
+
+def watch_cache(name, cache):
+    """Count ``cache.hits`` / ``cache.misses`` towards whichever stage is running."""
+    _caches[name] = cache
+
+
+def peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT if resource else 0
+
+
+def cache_counts():
+    return (sum(c.hits for c in _caches.values()), sum(c.misses for c in _caches.values()))
+
+
+class _Disabled:
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_DISABLED = _Disabled()
+
+
+class Stage:
+    """Wall time, rows, peak RSS growth and cache hits/misses of one block.
+
+    The RSS figure is how far the process high-water mark rose, so a stage
+    that stays under an earlier peak reports 0. Cache counters are process
+    wide, so concurrent sessions can show up in each other's stages.
+    """
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self._rss = peak_rss()
+        self._cache = cache_counts()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        hits, misses = (now - before for now, before in zip(cache_counts(), self._cache))
+        _record({
+            "ts": round(time.time(), 3),
+            "stage": self.name,
+            "ms": round(seconds * 1000, 2),
+            "rows": self.rows,
+            "rss_delta_mb": round((peak_rss() - self._rss) / 1024 / 1024, 2),
+            "cache": "hit" if hits and not misses else "miss" if misses else None,
+            "cache_hits": hits,
+            "cache_misses": misses,
+            "error": exc_type.__name__ if exc_type else None,
+        })
+        return False
+
+
+def stage(name, rows=None):
+    """``with perf.stage("load") as s: ...; s.rows = n`` — a no-op unless enabled."""
+    return Stage(name, rows) if ENABLED else _DISABLED
+
+
+def _record(entry):
+    with _lock:
+        recent.append(entry)
+        total = totals.setdefault(entry['stage'], dict.fromkeys(
+            ['count', 'seconds', 'rows', 'rss_delta_max_mb', 'cache_hits', 'cache_misses'], 0))
+        total['count'] += 1
+        total['seconds'] += entry['ms'] / 1000
+        total['rows'] += entry['rows'] or 0
+        total['rss_delta_max_mb'] = max(total['rss_delta_max_mb'], entry['rss_delta_mb'])
+        total['cache_hits'] += entry['cache_hits']
+        total['cache_misses'] += entry['cache_misses']
+        if METRICS_FILE:
+            with open(METRICS_FILE + '.tmp', 'w', encoding='utf-8') as f:
+                f.write(metrics_text())
+            os.replace(METRICS_FILE + '.tmp', METRICS_FILE)
+    log.info(json.dumps(entry, ensure_ascii=False))
+
+
+def snapshot():
+    """(recent stage records, newest first; per-stage totals) for display."""
+    with _lock:
+        return list(reversed(recent)), {name: dict(total) for name, total in totals.items()}
+
+
+# ── Prometheus text format ───────────────────────────────────────────────────
+METRICS = [
+    ('sales_stage_seconds_sum', 'summary', "Wall time spent in each dashboard stage.", 'seconds'),
+    ('sales_stage_seconds_count', None, None, 'count'),
+    ('sales_stage_rows_total', 'counter', "Rows processed by each stage.", 'rows'),
+    ('sales_stage_rss_delta_max_bytes', 'gauge', "Largest rise of the process peak RSS during a stage.",
+     'rss_delta_max_mb'),
+    ('sales_stage_cache_hits_total', 'counter', "Cache hits while a stage ran.", 'cache_hits'),
+    ('sales_stage_cache_misses_total', 'counter', "Cache misses while a stage ran.", 'cache_misses'),
+]
+
+
+def metrics_text():
+    lines = []
+    for name, kind, help_text, field in METRICS:
+        if kind:
+            family = name[:-len('_sum')] if name.endswith('_sum') else name
+            lines += [f"# HELP {family} {help_text}", f"# TYPE {family} {kind}"]
+        for stage_name, total in sorted(totals.items()):
+            value = total[field] * 1024 * 1024 if field == 'rss_delta_max_mb' else total[field]
+            label = stage_name.replace('\\', '\\\\').replace('"', '\\"')
+            lines.append(f'{name}{{stage="{label}"}} {round(value, 6)}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,69 @@
+import pandas as pd
+
+import schema
+from store import NUMERIC_COLUMNS
+
+DATE_COLUMN = schema.DATE_COLUMN
+SAMPLE_ROWS = 20
+
+
+def row_hashes(df):
+    """One 64-bit hash per row, so duplicate detection is a single Series pass."""
+    return pd.util.hash_pandas_object(df, index=False)
+
+
+def profile(df, sample_rows=SAMPLE_ROWS):
+    """Per-column quality summary plus small samples of the offending rows.
+
+    ``df`` is a frame from the loader (see schema.enforce): values that did
+    not parse are null in the typed column and kept in its ``__raw`` twin,
+    so nothing needs re-parsing here. Every check is column-wise.
+    """
+    columns = [c for c in df.columns if c not in schema.helper_columns(df)]
+    rejected = {name: df[schema.reject_column(name)].notna()
+                for name in schema.PARSED_COLUMNS if schema.reject_column(name) in df}
+    isna = df[columns].isna()
+    for name, mask in rejected.items():
+        isna[name] &= ~mask
+    bad = {}
+    report = []
+    for name in columns:
+        col = df[name]
+        info = {
+            "คอลัมน์": name,
+            "ชนิดข้อมูล": str(col.dtype),
+            "ค่าว่าง": int(isna[name].sum()),
+            "ตัวเลขผิดรูปแบบ": 0,
+            "วันที่ผิดรูปแบบ": 0,
+            "ค่าต่ำสุด": None,
+            "ค่าสูงสุด": None,
+        }
+        if name in NUMERIC_COLUMNS or name == DATE_COLUMN:
+            invalid = rejected.get(name, pd.Series(False, index=df.index))
+            label = "วันที่ผิดรูปแบบ" if name == DATE_COLUMN else "ตัวเลขผิดรูปแบบ"
+            info[label] = int(invalid.sum())
+            bad[f"{name}: {label}"] = invalid
+            if col.notna().any():
+                info["ค่าต่ำสุด"] = str(col.min())
+                info["ค่าสูงสุด"] = str(col.max())
+        report.append(info)
+
+    null_rows = isna.any(axis=1)
+    # Rows that differ only in their unparseable text are still different rows.
+    raw_columns = [schema.reject_column(name) for name in rejected]
+    hashes = row_hashes(df[columns + raw_columns])
+    in_dup_group = hashes.duplicated(keep=False)
+    extra_copies = hashes.duplicated(keep='first')
+
+    dup_rows = df[in_dup_group].assign(_hash=hashes[in_dup_group]).sort_values('_hash', kind='stable')
+    return {
+        "rows": len(df),
+        "columns": pd.DataFrame(report).set_index("คอลัมน์"),
+        "null_rows": int(null_rows.sum()),
+        "null_sample": schema.display(df[null_rows].head(sample_rows)),
+        "duplicate_rows": int(extra_copies.sum()),
+        "duplicate_groups": int(in_dup_group.sum() - extra_copies.sum()),
+        "duplicate_sample": schema.display(dup_rows.drop(columns='_hash').head(sample_rows)),
+        "invalid_samples": {label: schema.display(df[mask].head(sample_rows))
+                            for label, mask in bad.items() if mask.any()},
+    }
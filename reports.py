@@ -0,0 +1,173 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+import cleaning
+import rollup
+import store
+
+REPORTS_DIR = 'reports'
+LATEST_FILE = 'latest.json'
+MANIFEST_FILE = 'manifest.json'
+KEEP_REPORTS = 5
+# Bump when the artifacts change shape, so older reports count as stale.
+REPORT_FORMAT = 2
+CHART_FILES = {'monthly_trend': 'monthly_trend.png', 'region_bars': 'region_bars.png'}
+
+
+def report_tables(cube):
+    """The tables Sections 3 and 5 show when nothing is filtered."""
+    return {
+        'cube': cube,
+        'monthly_sales': rollup.monthly_sales(cube),
+        'top_products': rollup.top_products(cube),
+        'region_sales': rollup.region_sales(cube),
+    }
+
+
+# ── Building ─────────────────────────────────────────────────────────────────
+def read_latest(out_dir=REPORTS_DIR):
+    """The manifest of the newest report, or None."""
+    try:
+        with open(os.path.join(out_dir, LATEST_FILE)) as f:
+            name = json.load(f)['report']
+        with open(os.path.join(out_dir, name, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def is_fresh(manifest, source):
+    return (manifest is not None and manifest.get('format') == REPORT_FORMAT
+            and manifest.get('source_version') == cleaning.source_version(source))
+
+
+def build(source=None, out_dir=REPORTS_DIR, force=False, keep=KEEP_REPORTS):
+    """Write a new report directory if the data changed since the newest one.
+
+    Each report is a directory named after its build time and data
+    version, holding the tables as Parquet and JSON, the chart PNGs and a
+    manifest; ``latest.json`` is switched to it last, so readers never
+    see a half-written report. Returns (manifest, built).
+    """
+    source = source or store.get_store()
+    os.makedirs(out_dir, exist_ok=True)
+    with store.file_lock(os.path.join(out_dir, LATEST_FILE)):
+        cleaning.refresh(source)
+        latest = read_latest(out_dir)
+        if not force and is_fresh(latest, source):
+            return latest, False
+
+        version = cleaning.source_version(source)
+        tables = report_tables(cleaning.clean_rollup(source))
+        images = {}
+        if not tables['cube'].empty:
+            import charts  # only builds need matplotlib
+            region_comp = tables['region_sales'].sort_values('Total_Sales', ascending=False, ignore_index=True)
+            images = {
+                'monthly_trend': charts.monthly_trend(tables['monthly_sales']),
+                'region_bars': charts.region_bars(region_comp),
+            }
+
+        tag = hashlib.blake2b(json.dumps(version).encode(), digest_size=4).hexdigest()
+        now = datetime.now()
+        # Microseconds keep names unique (and sorted) when builds come back to back.
+        name, seq = now.strftime('%Y%m%dT%H%M%S%f') + '-' + tag, 0
+        while os.path.exists(os.path.join(out_dir, name)):
+            seq += 1
+            name = f"{now.strftime('%Y%m%dT%H%M%S%f')}{seq:02d}-{tag}"
+        tmp = os.path.join(out_dir, name + '.tmp')
+        os.makedirs(tmp)
+        try:
+            for key, table in tables.items():
+                table.to_parquet(os.path.join(tmp, key + '.parquet'), index=False)
+                if key != 'cube':
+                    table.to_json(os.path.join(tmp, key + '.json'), orient='records', force_ascii=False)
+            for key, data in images.items():
+                with open(os.path.join(tmp, CHART_FILES[key]), 'wb') as f:
+                    f.write(data)
+            manifest = {
+                'report': name,
+                'format': REPORT_FORMAT,
+                'created': now.strftime('%Y-%m-%d %H:%M:%S'),
+                'source_version': version,
+                'rows': int(tables['cube']['Rows'].sum()),
+                'tables': sorted(tables),
+                'charts': {key: CHART_FILES[key] for key in images},
+            }
+            with open(os.path.join(tmp, MANIFEST_FILE), 'w') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, os.path.join(out_dir, name))
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+        with open(os.path.join(out_dir, LATEST_FILE + '.tmp'), 'w') as f:
+            json.dump({'report': name}, f)
+        os.replace(os.path.join(out_dir, LATEST_FILE + '.tmp'), os.path.join(out_dir, LATEST_FILE))
+
+        # Names sort by build time; keep the newest few. Builds hold the lock,
+        # so any .tmp directory left now is from one that was killed.
+        dirs = sorted(d for d in os.listdir(out_dir) if os.path.isdir(os.path.join(out_dir, d)))
+        old = [d for d in dirs if d.endswith('.tmp')] + [d for d in dirs if not d.endswith('.tmp')][:-keep]
+        for d in old:
+            shutil.rmtree(os.path.join(out_dir, d), ignore_errors=True)
+    return manifest, True
+
+
+# ── Serving ──────────────────────────────────────────────────────────────────
+_lock = threading.Lock()
+_loaded = {}  # report name -> loaded report, newest only
+
+
+def latest(source=None, out_dir=REPORTS_DIR):
+    """The newest report, loaded, if it still matches ``source``; otherwise None.
+
+    Checking costs a manifest read and the store's version; the tables and
+    chart bytes are read once per report and shared by every session.
+    """
+    source = source or store.get_store()
+    manifest = read_latest(out_dir)
+    if not is_fresh(manifest, source):
+        return None
+    name = manifest['report']
+    with _lock:
+        if name not in _loaded:
+            path = os.path.join(out_dir, name)
+            report = {key: pd.read_parquet(os.path.join(path, key + '.parquet')) for key in manifest['tables']}
+            for key, file_name in manifest['charts'].items():
+                with open(os.path.join(path, file_name), 'rb') as f:
+                    report[key] = f.read()
+            report['manifest'] = manifest
+            _loaded.clear()
+            _loaded[name] = report
+        return _loaded[name]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Precompute the Section 3/5 reports without Streamlit. Run 'build' from cron "
+                    "(e.g. */15 * * * * python reports.py build) or keep 'watch' running.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_build = sub.add_parser('build', help="build a report if the data changed since the last one")
+    p_build.add_argument('--force', action='store_true', help="build even if the newest report is current")
+    p_watch = sub.add_parser('watch', help="check for changed data every --interval seconds")
+    p_watch.add_argument('--interval', type=float, default=300)
+    for p in (p_build, p_watch):
+        p.add_argument('--out', default=REPORTS_DIR)
+    args = parser.parse_args()
+
+    while True:
+        manifest, built = build(out_dir=args.out, force=args.command == 'build' and args.force)
+        state = "built" if built else "up to date"
+        print(f"{time.strftime('%H:%M:%S')} {state}: {manifest['report']} ({manifest['rows']:,} rows)", flush=True)
+        if args.command == 'build':
+            break
+        time.sleep(args.interval)
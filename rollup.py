@@ -0,0 +1,112 @@
+import os
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+import store
+
+ROLLUP_FILE = 'sales_rollup.arrow'
+DIMENSIONS = ['Month', 'Region', 'Category', 'Product Name']
+MEASURES = ['Quantity', 'Total_Sales', 'Rows']
+
+
+# ── Building ─────────────────────────────────────────────────────────────────
+def empty():
+    return pd.DataFrame({
+        'Month': pd.Series(dtype=object), 'Region': pd.Series(dtype=object),
+        'Category': pd.Series(dtype=object), 'Product Name': pd.Series(dtype=object),
+        'Quantity': pd.Series(dtype='float64'), 'Total_Sales': pd.Series(dtype='float64'),
+        'Rows': pd.Series(dtype='int64'),
+    })
+
+
+def merge(cubes):
+    """Sum cubes cell by cell; cubes are additive, so order does not matter."""
+    cubes = [cube for cube in cubes if not cube.empty]
+    if not cubes:
+        return empty()
+    cube = pd.concat(cubes, ignore_index=True)
+    return cube.groupby(DIMENSIONS, dropna=False, sort=True)[MEASURES].sum().reset_index()
+
+
+def rollup(frame):
+    """Aggregate cleaned rows to Month × Region × Category × Product cells.
+
+    Rows with a missing Region, Category or Product keep their own cell, so
+    the monthly totals still add up to the whole dataset.
+    """
+    if frame.empty:
+        return empty()
+    months = frame['Date'].to_numpy().astype('datetime64[M]')
+    cells = pd.DataFrame({
+        'Month': months,
+        'Region': frame['Region'].to_numpy(),
+        'Category': frame['Category'].to_numpy(),
+        'Product Name': frame['Product Name'].to_numpy(),
+        'Quantity': frame['Quantity'].to_numpy(),
+        'Total_Sales': frame['Quantity'].to_numpy() * frame['Unit Price'].to_numpy(),
+        'Rows': np.ones(len(frame), dtype='int64'),
+    })
+    cube = cells.groupby(DIMENSIONS, dropna=False, sort=False)[MEASURES].sum().reset_index()
+    # Format months once per cell rather than once per row.
+    cube['Month'] = cube['Month'].dt.strftime('%Y-%m')
+    return cube
+
+
+# ── Storage ──────────────────────────────────────────────────────────────────
+def save(cube, path=ROLLUP_FILE):
+    cube.reset_index(drop=True).to_feather(path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def load(path=ROLLUP_FILE):
+    """The saved cube, shared through the process-wide frame cache."""
+    if not os.path.exists(path):
+        return empty()
+    key = ('rollup:' + os.path.abspath(path), None, store.file_key(path)[1:])
+    cube = store.frame_cache.get(key)
+    if cube is None:
+        cube = pd.read_feather(path)
+        store.frame_cache.put(key, cube)
+    return cube
+
+
+# ── Queries ──────────────────────────────────────────────────────────────────
+def monthly_sales(cube):
+    return cube.groupby('Month')['Total_Sales'].sum().reset_index()
+
+
+def top_products(cube, n=5):
+    return cube.groupby('Product Name')['Quantity'].sum().sort_values(ascending=False).head(n).reset_index()
+
+
+def region_sales(cube):
+    return cube.groupby('Region')['Total_Sales'].sum().reset_index()
+
+
+def query_rollup(sql_store, start=None, end=None, regions=(), categories=()):
+    """The cube for a filter, aggregated inside a SqliteStore of cleaned rows.
+
+    Dates are stored as ISO text, so the range is a plain string comparison
+    that can use the index on Date; only the cube cells come back to pandas.
+    """
+    where, params = [], []
+    if start is not None:
+        where.append('"Date" >= ?')
+        params.append(str(start))
+    if end is not None:
+        where.append('"Date" < ?')
+        params.append(str(pd.Timestamp(end).date() + timedelta(days=1)))
+    for column, values in (('Region', regions), ('Category', categories)):
+        if values:
+            where.append(f'{store.quote(column)} IN ({", ".join("?" * len(values))})')
+            params.extend(values)
+    cube = sql_store.query(
+        'SELECT substr("Date", 1, 7) AS "Month", "Region", "Category", "Product Name", '
+        'SUM("Quantity") AS "Quantity", SUM("Quantity" * "Unit Price") AS "Total_Sales", COUNT(*) AS "Rows" '
+        f'FROM {sql_store.table} {"WHERE " + " AND ".join(where) if where else ""} '
+        'GROUP BY 1, 2, 3, 4', params)
+    if cube.empty:
+        return empty()
+    return cube.astype({'Quantity': 'float64', 'Total_Sales': 'float64', 'Rows': 'int64'})
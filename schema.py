@@ -0,0 +1,160 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+# ── In-memory schema ─────────────────────────────────────────────────────────
+# What the loader turns every frame into, whatever the backend stored.
+CATEGORY_COLUMNS = ['Product_ID', 'Product Name', 'Category', 'Region']
+DATE_COLUMN = 'Date'
+INTEGER_COLUMNS = ['Quantity']
+FLOAT_COLUMNS = ['Unit Price']
+PARSED_COLUMNS = [DATE_COLUMN] + INTEGER_COLUMNS + FLOAT_COLUMNS
+DERIVED_COLUMN = 'Total_Sales'
+REJECT_SUFFIX = '__raw'
+INTEGER_TYPES = [np.int8, np.int16, np.int32, np.int64]
+INT64_LIMIT = 2.0 ** 63
+
+
+def reject_column(name):
+    """Column holding the original text of ``name`` where it failed to parse."""
+    return name + REJECT_SUFFIX
+
+
+def helper_columns(frame):
+    return [c for c in frame.columns if c == DERIVED_COLUMN or c.endswith(REJECT_SUFFIX)]
+
+
+def whole_numbers(number):
+    """``number`` where it is a whole number that fits in int64; null elsewhere."""
+    as_float = number.astype('float64')
+    fits = (as_float == as_float.round()) & (as_float >= -INT64_LIMIT) & (as_float < INT64_LIMIT)
+    return number.where(fits)
+
+
+def smallest_integer(values):
+    """``values`` as the narrowest integer dtype that holds them (nullable if needed)."""
+    valid = values.dropna()
+    lo, hi = (valid.min(), valid.max()) if len(valid) else (0, 0)
+    kind = next(t for t in INTEGER_TYPES if np.iinfo(t).min <= lo and hi <= np.iinfo(t).max)
+    if valid.size < values.size:
+        return values.astype(pd.api.types.pandas_dtype(kind.__name__.capitalize()))
+    return values.astype(kind)
+
+
+def infer_date_format(dates):
+    """The format of the first date in ``dates``, as a whole-column to_datetime would infer it."""
+    first = dates.dropna()
+    if first.empty:
+        return None
+    return guess_datetime_format(str(first.iloc[0])) or 'mixed'
+
+
+def parse(name, col, date_format=None, validated=False):
+    """Typed version of column ``name``; values that cannot be parsed become null.
+
+    Dates are read with ``date_format``, or else the format of the first one.
+    A ``validated`` column (one from the cleaned store) may hold fractional
+    quantities, which then stay float.
+    """
+    if name == DATE_COLUMN:
+        if pd.api.types.is_datetime64_any_dtype(col):
+            return col
+        text = col.where(col.isna(), col.astype(str))
+        return pd.to_datetime(text, errors='coerce', format=date_format or infer_date_format(text))
+    number = pd.to_numeric(col, errors='coerce')
+    if name in INTEGER_COLUMNS:
+        whole = whole_numbers(number)
+        if validated and whole.count() < number.count():
+            return number.astype('float64')
+        # A fractional or out-of-range quantity is as malformed as a non-numeric one.
+        return smallest_integer(whole)
+    return number.astype('float64')
+
+
+def enforce(frame, keep_rejects=True, date_format=None):
+    """``frame`` in the compact schema.
+
+    Text dimensions become categoricals, integers are downcast, Date is
+    parsed once and ``Total_Sales`` is derived. With ``keep_rejects`` each
+    parsed column gets a categorical ``<name>__raw`` twin holding the
+    original text of the values that did not parse (null elsewhere), so
+    the reject mask costs one byte per row. Typed stores hand in the twin
+    they stored, which is used as it is. Rows added to an already loaded
+    frame pass the ``date_format`` that frame was parsed with. Without
+    ``keep_rejects`` the rows are taken to be validated already.
+    """
+    columns, rejects = {}, {}
+    for name in frame.columns:
+        col = frame[name]
+        if name.endswith(REJECT_SUFFIX):
+            continue
+        if name in CATEGORY_COLUMNS and not isinstance(col.dtype, pd.CategoricalDtype):
+            col = col.where(col.isna(), col.astype(str)).astype('category')
+        elif name in PARSED_COLUMNS:
+            parsed = parse(name, col, date_format, validated=not keep_rejects)
+            if keep_rejects and reject_column(name) in frame:
+                rejects[reject_column(name)] = frame[reject_column(name)].astype('category')
+            elif keep_rejects:
+                bad = parsed.isna() & col.notna()
+                rejects[reject_column(name)] = col.astype(str).where(bad).astype('category')
+            col = parsed
+        columns[name] = col
+    if 'Quantity' in columns and 'Unit Price' in columns:
+        columns[DERIVED_COLUMN] = columns['Quantity'].astype('float64') * columns['Unit Price']
+    columns.update(rejects)
+    return pd.DataFrame(columns, index=frame.index)
+
+
+def concat(frames):
+    """pd.concat that keeps categorical columns categorical."""
+    frames = list(frames)
+    for name in frames[0].columns:
+        if not isinstance(frames[0][name].dtype, pd.CategoricalDtype):
+            continue
+        base = frames[0][name].cat.categories
+        extra = pd.Index([]).append([f[name].astype('category').cat.categories for f in frames[1:]])
+        categories = base.append(extra.unique().difference(base))
+        frames = [f.assign(**{name: f[name].astype('category').cat.set_categories(categories)})
+                  for f in frames]
+    return pd.concat(frames)
+
+
+def display(frame):
+    """Rows as they were entered: rejected text restored, helper columns dropped."""
+    out = frame.drop(columns=helper_columns(frame))
+    for name in PARSED_COLUMNS:
+        raw = reject_column(name)
+        if raw in frame and frame[raw].notna().any():
+            typed = out[name]
+            if name == DATE_COLUMN and (typed.dropna() == typed.dropna().dt.normalize()).all():
+                typed = typed.dt.strftime('%Y-%m-%d')
+            out[name] = typed.astype(object).where(frame[raw].isna(), frame[raw].astype(object))
+    return out
+
+
+# ── Memory report ────────────────────────────────────────────────────────────
+def memory_report(before, after):
+    """Deep memory per column (MB) of the raw frame and its compact form."""
+    mb = 1024 * 1024
+    report = pd.DataFrame({
+        'before_mb': before.memory_usage(deep=True, index=False) / mb,
+        'after_mb': after.memory_usage(deep=True, index=False) / mb,
+    })
+    report = report.reindex(list(before.columns) + [c for c in after.columns if c not in before.columns])
+    report.loc['total'] = report.sum()
+    report['dtype'] = pd.Series({c: str(after[c].dtype) for c in after.columns})
+    return report.round(3)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the memory of a raw CSV load with the compact schema")
+    parser.add_argument('path', nargs='?', default='sales_data.csv')
+    args = parser.parse_args()
+
+    raw = pd.read_csv(args.path)
+    report = memory_report(raw, enforce(raw))
+    print(report.to_string())
+    before, after = report.loc['total', ['before_mb', 'after_mb']]
+    print(f"{len(raw):,} rows: {before:.2f} MB -> {after:.2f} MB ({after / before:.0%})")
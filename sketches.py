@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import store
+
+SKETCH_FILE = 'sales_sketches.json'
+TOPK_CAPACITY = 1000
+HLL_PRECISION = 12  # 4096 registers, about 1.6% standard error
+# Columns whose distinct values are counted; the data has no customer column.
+DISTINCT_COLUMNS = ['Product_ID', 'Product Name']
+# exact (default), approx, or auto: approximate once the catalog is this large.
+TOPK_MODE = os.environ.get('SALES_TOPK_MODE', 'exact')
+AUTO_MIN_PRODUCTS = 100_000
+
+
+# ── Heavy hitters ────────────────────────────────────────────────────────────
+def ranked(counts):
+    """Heaviest first, ties by name, so the result does not depend on merge order."""
+    return counts.sort_index().sort_values(ascending=False, kind='stable')
+
+
+class SpaceSaving:
+    """Weighted Space-Saving summary of the ``capacity`` heaviest items.
+
+    ``counts`` never underestimates an item's true weight and overestimates
+    it by at most ``errors``. Summaries of different partitions merge into
+    a summary of their union, so chunks and stores can be sketched apart.
+    """
+
+    def __init__(self, capacity=TOPK_CAPACITY, counts=None, errors=None):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype='float64') if counts is None else counts
+        self.errors = pd.Series(0.0, index=self.counts.index) if errors is None else errors
+
+    def floor(self):
+        """Upper bound on the weight of any item not in the summary."""
+        return float(self.counts.min()) if len(self.counts) >= self.capacity else 0.0
+
+    def merge(self, other):
+        items = self.counts.index.union(other.counts.index)
+        floors = self.floor(), other.floor()
+        counts = (self.counts.reindex(items, fill_value=floors[0])
+                  + other.counts.reindex(items, fill_value=floors[1]))
+        errors = (self.errors.reindex(items, fill_value=floors[0])
+                  + other.errors.reindex(items, fill_value=floors[1]))
+        keep = ranked(counts).index[:self.capacity]
+        return SpaceSaving(self.capacity, counts[keep], errors[keep])
+
+    def add(self, items, weights):
+        """Fold in a batch: the batch is summed exactly, then merged."""
+        batch = pd.Series(np.asarray(weights, dtype='float64')).groupby(np.asarray(items), sort=False).sum()
+        return self.merge(SpaceSaving(self.capacity, batch, pd.Series(0.0, index=batch.index)))
+
+    def top(self, n):
+        counts = ranked(self.counts).head(n)
+        return pd.DataFrame({'item': counts.index, 'count': counts.to_numpy(),
+                             'error': self.errors[counts.index].to_numpy()})
+
+    def to_dict(self):
+        return {'capacity': self.capacity, 'items': self.counts.index.tolist(),
+                'counts': self.counts.tolist(), 'errors': self.errors.tolist()}
+
+    @classmethod
+    def from_dict(cls, d):
+        index = pd.Index(d['items'], dtype=object)
+        return cls(d['capacity'], pd.Series(d['counts'], index=index, dtype='float64'),
+                   pd.Series(d['errors'], index=index, dtype='float64'))
+
+
+# ── Distinct counts ──────────────────────────────────────────────────────────
+def bit_length(values):
+    """Exact bit length of each uint64 in ``values``."""
+    x, length = values.copy(), np.zeros(len(values), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = x >= np.uint64(1 << shift)
+        length[big] += shift
+        x[big] >>= np.uint64(shift)
+    return length + (x > 0)
+
+
+class HyperLogLog:
+    """Distinct-count sketch; merging two is an elementwise max of registers."""
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8) if registers is None else registers
+
+    def add(self, values):
+        """A new sketch with ``values`` (nulls skipped) added."""
+        values = pd.Series(values).dropna()
+        registers = self.registers.copy()
+        if values.empty:
+            return HyperLogLog(self.precision, registers)
+        hashes = pd.util.hash_array(values.astype(str).to_numpy(object))
+        low_bits = 64 - self.precision
+        buckets = (hashes >> np.uint64(low_bits)).astype(np.int64)
+        ranks = low_bits - bit_length(hashes & np.uint64((1 << low_bits) - 1)) + 1
+        np.maximum.at(registers, buckets, ranks.astype(np.uint8))
+        return HyperLogLog(self.precision, registers)
+
+    def merge(self, other):
+        return HyperLogLog(self.precision, np.maximum(self.registers, other.registers))
+
+    def count(self):
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(int)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)  # linear counting for small sets
+        return int(round(estimate))
+
+    def to_dict(self):
+        return {'precision': self.precision, 'registers': self.registers.tolist()}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['precision'], np.asarray(d['registers'], dtype=np.uint8))
+
+
+# ── Sketches of the cleaned data ─────────────────────────────────────────────
+def empty():
+    return {'top_products': SpaceSaving(),
+            'distinct': {name: HyperLogLog() for name in DISTINCT_COLUMNS}}
+
+
+def update(sketch, clean):
+    """A new sketch with the cleaned rows ``clean`` folded in; ``sketch`` is left as is."""
+    # Like the exact groupby, rows without a product name are not ranked.
+    named = clean[clean['Product Name'].notna()]
+    return {'top_products': sketch['top_products'].add(named['Product Name'].astype(str), named['Quantity']),
+            'distinct': {name: hll.add(clean[name]) for name, hll in sketch['distinct'].items()}}
+
+
+def merge(a, b):
+    """Sketch of the union of two partitions."""
+    return {'top_products': a['top_products'].merge(b['top_products']),
+            'distinct': {name: a['distinct'][name].merge(b['distinct'][name]) for name in DISTINCT_COLUMNS}}
+
+
+def save(sketch, path=SKETCH_FILE):
+    data = {'top_products': sketch['top_products'].to_dict(),
+            'distinct': {name: hll.to_dict() for name, hll in sketch['distinct'].items()}}
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+_lock = threading.Lock()
+_loaded = {}  # file key -> sketch, newest only
+
+
+def load(path=SKETCH_FILE):
+    """The saved sketch, read once per file version."""
+    if not os.path.exists(path):
+        return empty()
+    key = store.file_key(path)
+    with _lock:
+        if key not in _loaded:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            _loaded.clear()
+            _loaded[key] = {
+                'top_products': SpaceSaving.from_dict(data['top_products']),
+                'distinct': {name: HyperLogLog.from_dict(d) for name, d in data['distinct'].items()},
+            }
+        return _loaded[key]
+
+
+# ── Queries ──────────────────────────────────────────────────────────────────
+def distinct_counts(sketch):
+    return {name: hll.count() for name, hll in sketch['distinct'].items()}
+
+
+def use_approx(sketch):
+    if TOPK_MODE == 'approx':
+        return True
+    return TOPK_MODE == 'auto' and sketch['distinct']['Product Name'].count() >= AUTO_MIN_PRODUCTS
+
+
+def top_products(sketch, n=5):
+    """Approximate rollup.top_products: same columns, from the Space-Saving summary."""
+    top = sketch['top_products'].top(n)
+    return pd.DataFrame({'Product Name': top['item'],
+                         'Quantity': top['count']})
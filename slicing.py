@@ -0,0 +1,113 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+import cleaning
+import rollup
+import store
+
+CODED_DIMENSIONS = ['Region', 'Category', 'Product Name']
+
+
+class FactIndex:
+    """The cleaned rows sorted by date, with every dimension as integer codes.
+
+    A date range is two binary searches into ``dates``; region and category
+    filters are masks over small integer arrays. Nothing here touches the
+    object columns after construction.
+    """
+
+    def __init__(self, frame):
+        dates = frame['Date'].to_numpy()
+        order = np.argsort(dates, kind='stable')
+        self.dates = dates[order]
+        self.codes, self.labels = {}, {}
+        for dim in CODED_DIMENSIONS:
+            col = frame[dim]
+            if isinstance(col.dtype, pd.CategoricalDtype):
+                # The loader already coded these; just reorder the codes.
+                codes, labels = col.cat.codes.to_numpy()[order], col.cat.categories
+            else:
+                codes, labels = pd.factorize(col.to_numpy()[order])
+            self.codes[dim], self.labels[dim] = codes.astype(np.int32), pd.Index(labels)
+        months, self.labels['Month'] = pd.factorize(self.dates.astype('datetime64[M]'))
+        self.codes['Month'] = months.astype(np.int32)
+        self.quantity = frame['Quantity'].to_numpy()[order]
+        self.sales = self.quantity * frame['Unit Price'].to_numpy()[order]
+
+    def __len__(self):
+        return len(self.dates)
+
+    def select(self, start=None, end=None, regions=(), categories=()):
+        """Positions of the rows inside the filter, as a slice plus optional mask."""
+        lo = 0 if start is None else np.searchsorted(self.dates, np.datetime64(start, 'D'), 'left')
+        hi = len(self.dates) if end is None else \
+            np.searchsorted(self.dates, np.datetime64(end, 'D') + 1, 'left')
+        mask = None
+        for dim, values in (('Region', regions), ('Category', categories)):
+            if values:
+                wanted = np.flatnonzero(self.labels[dim].isin(list(values)))
+                part = np.isin(self.codes[dim][lo:hi], wanted)
+                mask = part if mask is None else mask & part
+        return slice(lo, hi), mask
+
+    def rollup(self, start=None, end=None, regions=(), categories=()):
+        """A rollup cube (see rollup.py) of just the rows inside the filter."""
+        rows, mask = self.select(start, end, regions, categories)
+
+        def take(values):
+            return values[rows] if mask is None else values[rows][mask]
+
+        dims = ['Month'] + CODED_DIMENSIONS
+        # Shift codes by one so that -1 (missing) packs into the cell key too.
+        sizes = [len(self.labels[dim]) + 1 for dim in dims]
+        packed = np.ravel_multi_index([take(self.codes[dim]) + 1 for dim in dims], sizes)
+        cells, inverse = np.unique(packed, return_inverse=True)
+        if not len(cells):
+            return rollup.empty()
+        cube = {}
+        for dim, codes in zip(dims, np.unravel_index(cells, sizes)):
+            cube[dim] = pd.Categorical.from_codes(codes - 1, self.labels[dim]).astype(object)
+        cube['Month'] = pd.DatetimeIndex(cube['Month']).strftime('%Y-%m').to_numpy(object)
+        cube['Quantity'] = np.bincount(inverse, weights=take(self.quantity))
+        cube['Total_Sales'] = np.bincount(inverse, weights=take(self.sales))
+        cube['Rows'] = np.bincount(inverse).astype('int64')
+        return pd.DataFrame(cube, columns=rollup.DIMENSIONS + rollup.MEASURES)
+
+
+# ── Shared instances ─────────────────────────────────────────────────────────
+_lock = threading.Lock()
+_index = {}  # clean store version -> FactIndex, newest only
+
+
+def fact_index():
+    """FactIndex of the current cleaned dataset, built once per data version."""
+    cleaning.clean_data()
+    version = cleaning.clean_store.version()
+    with _lock:
+        if version not in _index:
+            _index.clear()
+            _index[version] = FactIndex(cleaning.clean_store.load())
+        return _index[version]
+
+
+def filtered_rollup(start=None, end=None, regions=(), categories=()):
+    """The rollup cube for one filter combination, memoized per data version."""
+    filters = (str(start), str(end), tuple(sorted(regions)), tuple(sorted(categories)))
+    clean_store = cleaning.clean_store
+    if isinstance(clean_store, store.SqliteStore):
+        # Push the aggregation down to SQL instead of indexing rows in memory.
+        cleaning.refresh()
+        index = None
+    else:
+        index = fact_index()
+    key = ('slice:' + clean_store.id, filters, clean_store.version())
+    cube = store.frame_cache.get(key)
+    if cube is None:
+        if index is None:
+            cube = rollup.query_rollup(clean_store, start, end, regions, categories)
+        else:
+            cube = index.rollup(start, end, regions, categories)
+        store.frame_cache.put(key, cube)
+    return cube
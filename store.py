@@ -0,0 +1,1190 @@
+import argparse
+import csv
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+import perf
+import schema
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DATA_FILE = 'sales_data.csv'
+ARROW_FILE = 'sales_data.arrow'
+SQLITE_FILE = 'sales_data.db'
+CHUNK_ROWS = 500_000
+COLUMNS = ["Date", "Product_ID", "Product Name", "Category", "Quantity", "Unit Price", "Region"]
+TEXT_COLUMNS = ["Date", "Product_ID", "Product Name", "Category", "Region"]
+NUMERIC_COLUMNS = ["Quantity", "Unit Price"]
+# Text is read as text, so IDs like '007' or names like '1e3' keep their spelling.
+TEXT_DTYPES = dict.fromkeys(TEXT_COLUMNS, str)
+
+INITIAL_DATA = {
+    "Date": ["2023-01-15", "2023-01-20"],
+    "Product_ID": ["P001", "P002"],
+    "Product Name": ["Laptop", "Mouse"],
+    "Category": ["IT", "IT"],
+    "Quantity": [10, 50],
+    "Unit Price": [25000, 500],
+    "Region": ["North", "South"]
+}
+
+# Date stays text so invalid dates survive for the quality and cleaning pages.
+# Numbers that do not parse are stored as null with their text in a twin
+# column, so the typed stores lose nothing the CSV store would keep.
+RAW_COLUMNS = [schema.reject_column(name) for name in NUMERIC_COLUMNS]
+ARROW_SCHEMA = pa.schema([
+    ("Date", pa.string()),
+    ("Product_ID", pa.string()),
+    ("Product Name", pa.string()),
+    ("Category", pa.string()),
+    ("Quantity", pa.int64()),
+    ("Unit Price", pa.float64()),
+    ("Region", pa.string()),
+] + [(name, pa.string()) for name in RAW_COLUMNS])
+
+# Callers get cheap views of cached frames; Copy-on-Write makes any write to
+# such a view copy the touched column instead of corrupting the cached one.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# ── File identity ────────────────────────────────────────────────────────────
+FINGERPRINT_BYTES = 64 * 1024
+
+
+def file_key(path):
+    """(path, mtime, size, fingerprint) — changes whenever the file content does."""
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_BYTES))
+        if stat.st_size > FINGERPRINT_BYTES:
+            f.seek(max(FINGERPRINT_BYTES, stat.st_size - FINGERPRINT_BYTES))
+            digest.update(f.read())
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, digest.hexdigest())
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive inter-process lock on a side file next to ``path``."""
+    with open(path + '.lock', 'a+b') as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def prefix_digest(path, end):
+    """Digest of the head and of the bytes just before ``end``."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        digest.update(f.read(min(FINGERPRINT_BYTES, end)))
+        if end > FINGERPRINT_BYTES:
+            f.seek(max(FINGERPRINT_BYTES, end - FINGERPRINT_BYTES))
+            digest.update(f.read(end - f.tell()))
+    return digest.hexdigest()
+
+
+class ByteWindow(io.RawIOBase):
+    """Read-only view of ``f`` that stops at byte ``end``."""
+
+    def __init__(self, f, end):
+        self.f = f
+        self.end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self.end - self.f.tell())
+        if n <= 0:
+            return 0
+        return self.f.readinto(memoryview(buffer)[:n])
+
+
+def fsync_write(f, data):
+    f.write(data)
+    f.flush()
+    os.fsync(f.fileno())
+
+
+# ── Frame cache (process-wide, shared by every Streamlit session) ────────────
+# Keys are (store id, column projection, store version).
+def frame_nbytes(frame):
+    return int(frame.memory_usage(index=True, deep=True).sum())
+
+
+class FrameCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (frame, nbytes, meta)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = self.misses = 0
+
+    def lookup(self, key):
+        """(read-only view, meta) for ``key``, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0].copy(deep=False), dict(entry[2])
+
+    def get(self, key):
+        entry = self.lookup(key)
+        return None if entry is None else entry[0]
+
+    def entries(self, store_id, version):
+        with self._lock:
+            return [(key, frame.copy(deep=False), dict(meta))
+                    for key, (frame, _, meta) in self._entries.items()
+                    if key[0] == store_id and key[2] == version]
+
+    def put(self, key, frame, **meta):
+        nbytes = frame_nbytes(frame)
+        with self._lock:
+            # Only the newest version of a projection is worth keeping.
+            for old in [k for k in self._entries if k[:2] == key[:2]]:
+                self._bytes -= self._entries.pop(old)[1]
+            if nbytes > self.max_bytes:
+                return
+            while self._entries and self._bytes + nbytes > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+            self._entries[key] = (frame, nbytes, meta)
+            self._bytes += nbytes
+
+    def invalidate(self, store_id=None):
+        with self._lock:
+            if store_id is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            for key in [k for k in self._entries if k[0] == store_id]:
+                self._bytes -= self._entries.pop(key)[1]
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+
+CACHE_MAX_BYTES = int(float(os.environ.get('SALES_CACHE_MAX_MB', '512')) * 1024 * 1024)
+frame_cache = FrameCache(CACHE_MAX_BYTES)
+perf.watch_cache('frames', frame_cache)
+
+
+# ── Tombstones ───────────────────────────────────────────────────────────────
+# A row's ID is its position in the store. IDs only change when compact()
+# rewrites the store, which also empties the tombstone log and changes the
+# generation; callers holding IDs across reads pass that generation to delete().
+TOMBSTONE_SUFFIX = '.tomb'
+COMPACT_MIN_TOMBSTONES = int(os.environ.get('SALES_COMPACT_MIN', '1000'))
+COMPACT_RATIO = 0.1
+
+
+def tombstone_path(file_path=DATA_FILE):
+    return file_path + TOMBSTONE_SUFFIX
+
+
+def read_tombstone_log(file_path=DATA_FILE):
+    """Tombstoned row IDs in the order they were deleted."""
+    path = tombstone_path(file_path)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [int(line) for line in f if line.strip()]
+
+
+def read_tombstones(file_path=DATA_FILE):
+    return set(read_tombstone_log(file_path))
+
+
+class RowIdsChanged(ValueError):
+    """delete() got row IDs read before a compaction renumbered the rows."""
+
+
+# ── Row parsing ──────────────────────────────────────────────────────────────
+def to_table(rows):
+    """Coerce raw rows to ARROW_SCHEMA; unparseable numbers become null, their text kept in the twin."""
+    rows = rows.reindex(columns=COLUMNS)
+    for name in TEXT_COLUMNS:
+        col = rows[name]
+        rows[name] = col.where(col.isna(), col.astype(str))
+    parsed = {'Quantity': schema.whole_numbers(pd.to_numeric(rows['Quantity'], errors='coerce')),
+              'Unit Price': pd.to_numeric(rows['Unit Price'], errors='coerce')}
+    for name, values in parsed.items():
+        col = rows[name]
+        rows[schema.reject_column(name)] = col.astype(str).where(values.isna() & col.notna())
+        rows[name] = values
+    arrays = [pa.array(rows[field.name], type=field.type, from_pandas=True) for field in ARROW_SCHEMA]
+    return pa.Table.from_arrays(arrays, schema=ARROW_SCHEMA)
+
+
+def as_entered(rows):
+    """Typed rows back as text the way they were entered; the reverse of to_table."""
+    out = rows.drop(columns=[c for c in RAW_COLUMNS if c in rows])
+    for name in NUMERIC_COLUMNS:
+        raw = schema.reject_column(name)
+        if raw not in rows:
+            continue
+        typed = rows[name].astype('Int64') if name == 'Quantity' else rows[name]
+        out[name] = typed.astype(object).where(rows[raw].isna(), rows[raw])
+    return out
+
+
+def parse_rows(text):
+    """Parse header-less CSV text the way ``CsvStore.read`` parses the file."""
+    return pd.read_csv(io.StringIO(text), header=None, names=COLUMNS, dtype=TEXT_DTYPES)
+
+
+# ── Backends ─────────────────────────────────────────────────────────────────
+class Store:
+    """Caching, tombstones and locking shared by every backend."""
+
+    name = None
+    columns = COLUMNS
+    # Raw stores keep the text of unparseable values next to the typed columns.
+    keep_rejects = True
+
+    def __init__(self, path):
+        self.path = path
+        self.id = os.path.abspath(path)
+        self._upgraded = False
+
+    # Backend hooks ───────────────────────────────────────────────────────────
+    def exists(self):
+        raise NotImplementedError
+
+    def initialize(self):
+        raise NotImplementedError
+
+    def upgrade(self):
+        """Bring a store written by an older version up to the current schema."""
+
+    def files(self):
+        """Files whose content defines the store (tombstone log excluded)."""
+        raise NotImplementedError
+
+    def read(self, columns):
+        """(frame of every stored row, tombstoned ones included; row count)."""
+        raise NotImplementedError
+
+    def encode(self, rows):
+        """``rows`` in the form write_rows() stores them."""
+        raise NotImplementedError
+
+    def write_rows(self, payload):
+        """Persist an encode() payload."""
+        raise NotImplementedError
+
+    def added_frame(self, payload):
+        """An encode() payload read back the way read() reads stored rows."""
+        raise NotImplementedError
+
+    def rewrite(self, tombs):
+        """Rewrite the data files without ``tombs``; returns rows removed."""
+        raise NotImplementedError
+
+    def generation(self):
+        """Changes whenever row IDs may have been reassigned (compaction, rewrite)."""
+        raise NotImplementedError
+
+    def stored_rows(self):
+        """Number of stored rows, tombstoned ones included, without reading them."""
+        raise NotImplementedError
+
+    def read_chunks(self, chunksize, cursor):
+        """Stored rows after ``cursor`` in row-ID order, advancing ``cursor``."""
+        raise NotImplementedError
+
+    def prefix_unchanged(self, cursor):
+        """True if the data ``cursor`` has already passed is byte-for-byte intact."""
+        raise NotImplementedError
+
+    def read_page(self, offset, limit, sort, ascending, search):
+        """(page of live rows as read() reads them, number of rows matching ``search``); typed stores only."""
+        raise NotImplementedError
+
+    def write_deletes(self, row_ids):
+        with open(tombstone_path(self.path), 'a') as f:
+            fsync_write(f, ''.join(f'{i}\n' for i in row_ids))
+
+    def delete_log(self):
+        """Deleted row IDs in the order they were deleted, for cursors."""
+        return read_tombstone_log(self.path)
+
+    def needs_compaction(self, pending, row_count):
+        return pending >= max(COMPACT_MIN_TOMBSTONES, COMPACT_RATIO * (row_count or 0))
+
+    # Shared behaviour ────────────────────────────────────────────────────────
+    def version(self):
+        tomb = tombstone_path(self.path)
+        parts = [file_key(p)[1:] for p in self.files()]
+        parts.append(file_key(tomb)[1:] if os.path.exists(tomb) else None)
+        return tuple(parts)
+
+    def cache_key(self, columns):
+        return (self.id, tuple(columns) if columns else None, self.version())
+
+    def ensure(self):
+        if not self.exists():
+            with file_lock(self.path):
+                if not self.exists():
+                    self.initialize()
+        if not self._upgraded:
+            with file_lock(self.path):
+                self.upgrade()
+            self._upgraded = True
+
+    def pending_deletes(self):
+        return len(read_tombstones(self.path))
+
+    def invalidate(self):
+        frame_cache.invalidate(self.id)
+
+    def load(self, columns=None):
+        """Live rows indexed by row ID in the compact schema, optionally only ``columns``."""
+        self.ensure()
+        cached = frame_cache.get(self.cache_key(columns))
+        if cached is not None:
+            return cached
+        # Holding the writer lock gives single-flight reads and keeps the data
+        # files and tombstone log consistent with each other while we read them.
+        with file_lock(self.path):
+            key = self.cache_key(columns)
+            cached = frame_cache.get(key)
+            if cached is not None:
+                return cached
+            names = list(columns) if columns else None
+            if names:
+                # Typed stores keep the text of bad numbers in twins; read those along.
+                names += [raw for raw in map(schema.reject_column, names) if raw in self.columns]
+            frame, row_count = self.read(names)
+            tombs = read_tombstones(self.path)
+            if tombs:
+                frame = frame[~frame.index.isin(list(tombs))]
+            # Kept so rows appended to the cached frame parse dates the same way.
+            date_format = schema.infer_date_format(frame['Date']) if 'Date' in frame else None
+            frame = schema.enforce(frame, self.keep_rejects, date_format)
+            frame_cache.put(key, frame, next_row_id=row_count, date_format=date_format)
+        return frame.copy(deep=False)
+
+    def page(self, offset, limit, sort=None, ascending=True, search=''):
+        """Live rows ``offset`` to ``offset + limit`` in the compact schema, plus how many there are.
+
+        Only rows with a column whose text contains ``search`` (any case)
+        count, in ``sort`` order (row order if None, nulls last). The store
+        is never loaded whole; only the page is converted.
+        """
+        self.ensure()
+        frame, total = self.read_page(offset, limit, sort, ascending, search)
+        return schema.enforce(frame, self.keep_rejects), total
+
+    def _carry_cache(self, old_version, update):
+        """Move cached projections of ``old_version`` to the current version."""
+        entries = frame_cache.entries(self.id, old_version)
+        if not entries:
+            self.invalidate()
+            return
+        new_version = self.version()
+        for key, frame, meta in entries:
+            frame, meta = update(frame, meta)
+            frame_cache.put((key[0], key[1], new_version), frame, **meta)
+
+    def append(self, rows):
+        """Append ``rows`` without rewriting existing data; returns rows written."""
+        rows = rows.reindex(columns=self.columns)
+        if rows.empty:
+            return 0
+        self.ensure()
+        # Encode and load the rows before anything is written, so rows the
+        # loader cannot handle fail here instead of leaving a store that
+        # will not load.
+        payload = self.encode(rows)
+        raw = self.added_frame(payload)
+        added_format = schema.infer_date_format(raw['Date']) if 'Date' in raw else None
+        added = schema.enforce(raw, self.keep_rejects, added_format)
+        with file_lock(self.path):
+            old_version = self.version()
+            self.write_rows(payload)
+
+            def update(frame, meta):
+                start = meta['next_row_id']
+                part = added
+                # Parse dates as the cached frame was parsed, or a cold load would disagree.
+                date_format = meta.get('date_format') or added_format
+                if 'Date' in frame and date_format != added_format:
+                    part = schema.enforce(raw[[c for c in raw.columns if c in frame.columns]],
+                                          self.keep_rejects, date_format)
+                part = part[list(frame.columns)].set_axis(pd.RangeIndex(start, start + len(added)))
+                return schema.concat([frame, part]), dict(meta, next_row_id=start + len(added),
+                                                          date_format=date_format)
+
+            self._carry_cache(old_version, update)
+        return len(rows)
+
+    def delete(self, row_ids, generation=None):
+        """Tombstone ``row_ids``; data files are only rewritten by compact().
+
+        With ``generation`` (from generation() before the IDs were read)
+        the delete raises RowIdsChanged instead if the rows were renumbered.
+        """
+        row_ids = sorted({int(i) for i in row_ids})
+        if not row_ids:
+            return 0
+        self.ensure()
+        row_count = None
+        with file_lock(self.path):
+            if generation is not None and generation != self.generation():
+                raise RowIdsChanged(f"{self.path} was compacted after the row IDs were read")
+            old_version = self.version()
+            self.write_deletes(row_ids)
+
+            def update(frame, meta):
+                nonlocal row_count
+                row_count = meta['next_row_id']
+                return frame.drop(index=row_ids, errors='ignore'), meta
+
+            self._carry_cache(old_version, update)
+            needs_compaction = self.needs_compaction(self.pending_deletes(), row_count)
+
+        if needs_compaction:
+            threading.Thread(target=self.compact, daemon=True).start()
+        return len(row_ids)
+
+    def compact(self):
+        """Fold pending deletes into the data files; returns rows removed."""
+        with file_lock(self.path):
+            old_version = self.version()
+            removed = self.rewrite(read_tombstones(self.path))
+            if os.path.exists(tombstone_path(self.path)):
+                os.remove(tombstone_path(self.path))
+            self._carry_cache(old_version, lambda frame, meta: (
+                frame.reset_index(drop=True), dict(meta, next_row_id=len(frame))))
+        return removed
+
+    def cursor(self):
+        """A read position at the start of the store, for iter_chunks()."""
+        return {'store': self.id, 'backend': self.name, 'generation': self.generation(),
+                'rows': 0, 'tombstones': 0}
+
+    def is_extension(self, cursor):
+        """True if the store has only had rows appended since ``cursor``.
+
+        Deleting a row the cursor has already passed, compacting, or editing
+        the data behind it all return False.
+        """
+        if not cursor or cursor.get('store') != self.id or cursor.get('backend') != self.name:
+            return False
+        if not self.exists() or cursor['generation'] != self.generation():
+            return False
+        log = self.delete_log()
+        if len(log) < cursor['tombstones']:
+            return False
+        if any(row_id < cursor['rows'] for row_id in log[cursor['tombstones']:]):
+            return False
+        return self.prefix_unchanged(cursor)
+
+    def iter_chunks(self, chunksize=CHUNK_ROWS, cursor=None):
+        """Live rows in row-ID order without materializing the whole store.
+
+        With a ``cursor`` only rows after it are read, and the cursor is
+        advanced in place; it is valid again once the iterator is exhausted.
+        """
+        self.ensure()
+        cursor = self.cursor() if cursor is None else cursor
+        log = self.delete_log()
+        cursor['tombstones'] = len(log)
+        tombs = pd.Index(sorted(set(log)))
+        for chunk in self.read_chunks(chunksize, cursor):
+            yield chunk[~chunk.index.isin(tombs)] if len(tombs) else chunk
+
+    def export_csv(self, dest):
+        # Straight from the stored rows, so values that do not parse survive as-is.
+        with open(dest, 'w', newline='', encoding='utf-8') as f:
+            for i, chunk in enumerate(self.iter_chunks()):
+                as_entered(chunk).to_csv(f, index=False, header=i == 0)
+
+
+class CsvStore(Store):
+    name = 'csv'
+    # Written by rewrites that drop rows, so a recycled inode cannot pass for the old file.
+    GENERATION_SUFFIX = '.gen'
+
+    def __init__(self, path=DATA_FILE):
+        super().__init__(path)
+
+    def exists(self):
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def initialize(self):
+        pd.DataFrame(INITIAL_DATA).to_csv(self.path, index=False)
+
+    def generation(self):
+        inode = os.stat(self.path).st_ino
+        if not os.path.exists(self.path + self.GENERATION_SUFFIX):
+            return inode
+        with open(self.path + self.GENERATION_SUFFIX) as f:
+            return f"{inode}:{f.read().strip()}"
+
+    def cursor(self):
+        return dict(super().cursor(), offset=0, prefix=None)
+
+    def files(self):
+        return [self.path]
+
+    def read(self, columns):
+        frame = pd.read_csv(self.path, usecols=columns, dtype=TEXT_DTYPES)
+        return (frame[columns] if columns else frame), len(frame)
+
+    def stored_rows(self):
+        return self.read([COLUMNS[0]])[1]
+
+    def read_chunks(self, chunksize, cursor):
+        # Stop at the size seen now so a concurrent append is never half read.
+        with file_lock(self.path):
+            end = os.path.getsize(self.path)
+        with open(self.path, 'rb') as f:
+            names = next(csv.reader([f.readline().decode('utf-8')]))
+            f.seek(max(cursor['offset'], f.tell()))
+            row_id = cursor['rows']
+            if f.tell() >= end:
+                chunks = []
+            else:
+                # Text-only chunks, so dtypes cannot drift from one chunk to the next.
+                chunks = pd.read_csv(io.BufferedReader(ByteWindow(f, end)), chunksize=chunksize,
+                                     dtype=str, header=None, names=names, encoding='utf-8')
+            for chunk in chunks:
+                chunk.index = pd.RangeIndex(row_id, row_id + len(chunk))
+                row_id += len(chunk)
+                cursor['rows'] = row_id
+                yield chunk
+        cursor['offset'] = end
+        cursor['prefix'] = prefix_digest(self.path, end)
+
+    def prefix_unchanged(self, cursor):
+        if os.path.getsize(self.path) < cursor['offset']:
+            return False
+        return cursor['offset'] == 0 or prefix_digest(self.path, cursor['offset']) == cursor['prefix']
+
+    def encode(self, rows):
+        return rows.to_csv(index=False, header=False)
+
+    def write_rows(self, body):
+        with open(self.path, 'a+b') as f:
+            f.seek(-1, os.SEEK_END)
+            prefix = b'' if f.read(1) == b'\n' else b'\n'
+            fsync_write(f, prefix + body.encode('utf-8'))
+
+    def added_frame(self, body):
+        return parse_rows(body)
+
+    def rewrite(self, tombs):
+        if not tombs:
+            return 0
+        # Stream row by row so compaction never holds the whole file in memory.
+        tmp_path = self.path + '.tmp'
+        removed = 0
+        with open(self.path, newline='', encoding='utf-8') as src, \
+                open(tmp_path, 'w', newline='', encoding='utf-8') as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst, lineterminator=os.linesep)
+            header = next(reader, None)
+            if header is not None:
+                writer.writerow(header)
+            row_id = 0
+            for row in reader:
+                if not row:  # read_csv skips blank lines, so they carry no ID
+                    continue
+                if row_id in tombs:
+                    removed += 1
+                else:
+                    writer.writerow(row)
+                row_id += 1
+            dst.flush()
+            os.fsync(dst.fileno())
+        if removed:
+            # Token first: a crash before the data is replaced only costs a full clean.
+            with open(self.path + self.GENERATION_SUFFIX + '.tmp', 'w') as f:
+                fsync_write(f, uuid.uuid4().hex)
+            os.replace(self.path + self.GENERATION_SUFFIX + '.tmp', self.path + self.GENERATION_SUFFIX)
+        os.replace(tmp_path, self.path)
+        return removed
+
+
+class ArrowStore(Store):
+    """Typed Arrow IPC (Feather v2) base file plus one small segment per append.
+
+    Files are written uncompressed so reads are memory-mapped and numeric
+    columns come back without a copy; only the requested columns are read.
+    The base file's schema metadata carries the generation, a token that is
+    replaced only when row IDs change; folding segments into the base file
+    keeps every row where it was, so it keeps the token.
+    """
+
+    name = 'arrow'
+    MAX_SEGMENTS = 64
+    MAX_ORDERS = 16
+    GENERATION_KEY = b'sales.generation'
+
+    def __init__(self, path=ARROW_FILE, schema=ARROW_SCHEMA, coerce=to_table, initial=INITIAL_DATA,
+                 keep_rejects=True):
+        super().__init__(path)
+        self.keep_rejects = keep_rejects
+        self.segment_dir = path + '.d'
+        # (version, sort, ascending, search) -> row positions for read_page(), newest last
+        self._orders = OrderedDict()
+        self._orders_lock = threading.Lock()
+        self.schema = schema
+        self.columns = schema.names
+        self.coerce = coerce
+        self.initial = initial
+
+    def segments(self):
+        if not os.path.isdir(self.segment_dir):
+            return []
+        return [os.path.join(self.segment_dir, name)
+                for name in sorted(os.listdir(self.segment_dir)) if name.endswith('.arrow')]
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def initialize(self):
+        table = self.schema.empty_table() if self.initial is None else self.coerce(pd.DataFrame(self.initial))
+        self._write_table(self._stamp(table, uuid.uuid4().hex), self.path)
+
+    def upgrade(self):
+        """Add columns the schema gained since the files were written, as nulls."""
+        for path in self.files():
+            with pa.memory_map(path) as source:
+                names = pa.ipc.open_file(source).schema.names
+            if set(self.columns) <= set(names):
+                continue
+            table = feather.read_table(path)
+            for field in self.schema:
+                if field.name not in names:
+                    table = table.append_column(field, pa.nulls(table.num_rows, field.type))
+            self._write_table(table.select(self.columns), path)
+
+    def _stamp(self, table, generation):
+        return table.replace_schema_metadata({self.GENERATION_KEY: generation})
+
+    def generation(self):
+        with pa.memory_map(self.path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+        if self.GENERATION_KEY in metadata:
+            return metadata[self.GENERATION_KEY].decode()
+        stat = os.stat(self.path)  # written before generations were stamped
+        return f"{stat.st_ino}:{stat.st_mtime_ns}:{stat.st_size}"
+
+    def files(self):
+        return [self.path] + self.segments()
+
+    def stored_rows(self):
+        # Batch lengths are in the file footers; mapping the files reads no data.
+        with file_lock(self.path):
+            rows = 0
+            for path in self.files():
+                with pa.memory_map(path) as source:
+                    reader = pa.ipc.open_file(source)
+                    rows += sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+        return rows
+
+    def _write_table(self, table, path):
+        tmp_path = path + '.tmp'
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+
+    def _read_table(self, columns=None):
+        tables = [feather.read_table(p, columns=columns, memory_map=True) for p in self.files()]
+        return pa.concat_tables(tables) if len(tables) > 1 else tables[0]
+
+    def read(self, columns):
+        table = self._read_table(columns)
+        return table.to_pandas(), table.num_rows
+
+    def read_chunks(self, chunksize, cursor):
+        # Within a generation rows are only ever appended, so the cursor is a
+        # row count. The files are mapped under the lock; a compaction that
+        # removes them afterwards does not disturb the mapped snapshot.
+        with file_lock(self.path):
+            sources = [pa.memory_map(p) for p in self.files()]
+        row_id = 0
+        try:
+            for source in sources:
+                reader = pa.ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    batch = reader.get_batch(i)
+                    batch_start, row_id = row_id, row_id + batch.num_rows
+                    for start in range(max(cursor['rows'] - batch_start, 0), batch.num_rows, chunksize):
+                        chunk = batch.slice(start, chunksize).to_pandas()
+                        chunk.index = pd.RangeIndex(batch_start + start, batch_start + start + len(chunk))
+                        cursor['rows'] = batch_start + start + len(chunk)
+                        yield chunk
+        finally:
+            for source in sources:
+                source.close()
+
+    def prefix_unchanged(self, cursor):
+        # Files are never edited in place; rewrites that move rows change the generation.
+        return True
+
+    def read_page(self, offset, limit, sort, ascending, search):
+        with file_lock(self.path):
+            table, version, tombs = self._read_table(), self.version(), read_tombstones(self.path)
+        positions = self._positions(table, version, tombs, sort, ascending, search)
+        if positions is None:
+            frame = table.slice(offset, limit).to_pandas()
+            frame.index = pd.RangeIndex(offset, offset + len(frame))
+            return frame, table.num_rows
+        page = positions[offset:offset + limit]
+        frame = table.take(pa.array(page)).to_pandas()
+        frame.index = pd.Index(page)
+        return frame, len(positions)
+
+    def _positions(self, table, version, tombs, sort, ascending, search):
+        """Positions of the live rows matching ``search`` in ``sort`` order; None for all rows as stored.
+
+        Only the columns searched or sorted on are paged in from the mapped
+        files. Results are kept per version for the next page.
+        """
+        if not (tombs or sort or search):
+            return None
+        key = (version, sort, ascending, search)
+        with self._orders_lock:
+            if key in self._orders:
+                self._orders.move_to_end(key)
+                return self._orders[key]
+        keep = np.ones(table.num_rows, dtype=bool)
+        keep[[i for i in tombs if i < table.num_rows]] = False
+        if search:
+            keep &= search_mask(table, search)
+        positions = np.flatnonzero(keep)
+        if sort:
+            order = 'ascending' if ascending else 'descending'
+            positions = positions[pc.array_sort_indices(table[sort].take(positions), order=order).to_numpy()]
+        with self._orders_lock:
+            self._orders[key] = positions
+            while len(self._orders) > self.MAX_ORDERS:
+                self._orders.popitem(last=False)
+        return positions
+
+    def encode(self, rows):
+        return self.coerce(rows)
+
+    def write_rows(self, table):
+        os.makedirs(self.segment_dir, exist_ok=True)
+        segments = self.segments()
+        seq = int(os.path.basename(segments[-1]).split('.')[0]) + 1 if segments else 0
+        self._write_table(table, os.path.join(self.segment_dir, f'{seq:08d}.arrow'))
+
+    def added_frame(self, table):
+        return table.to_pandas()
+
+    def needs_compaction(self, pending, row_count):
+        return (len(self.segments()) > self.MAX_SEGMENTS
+                or super().needs_compaction(pending, row_count))
+
+    def append(self, rows):
+        written = super().append(rows)
+        if len(self.segments()) > self.MAX_SEGMENTS:
+            threading.Thread(target=self.compact, daemon=True).start()
+        return written
+
+    def rewrite(self, tombs):
+        segments = self.segments()
+        if not tombs and not segments:
+            return 0
+        table = self._read_table()
+        keep = ~pd.RangeIndex(table.num_rows).isin(list(tombs))
+        removed = int((~keep).sum())
+        generation = uuid.uuid4().hex if removed else self.generation()
+        self._write_table(self._stamp(table.filter(pa.array(keep)), generation), self.path)
+        for segment in segments:
+            os.remove(segment)
+        return removed
+
+    def reset(self, tables):
+        """Replace the whole store with ``tables``, streamed to disk in order."""
+        tmp_path = self.path + '.new'
+        schema = self.schema.with_metadata({self.GENERATION_KEY: uuid.uuid4().hex})
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+            for table in tables:
+                writer.write_table(table)
+        with file_lock(self.path):
+            os.replace(tmp_path, self.path)
+            for path in self.segments() + [tombstone_path(self.path)]:
+                if os.path.exists(path):
+                    os.remove(path)
+            self.invalidate()
+
+
+def searchable(columns):
+    """The columns a page search looks in: every stored one but the raw-text twins."""
+    return [name for name in columns if not name.endswith(schema.REJECT_SUFFIX)]
+
+
+def search_mask(table, text):
+    """Rows of an Arrow ``table`` where any searchable column's text contains ``text``, any case."""
+    mask = np.zeros(table.num_rows, dtype=bool)
+    for name in searchable(table.column_names):
+        col = table[name]
+        if not pa.types.is_string(col.type):
+            col = pc.cast(col, pa.string())  # dates and numbers by their text, so 2023 matches
+        hits = pc.match_substring(col, text, ignore_case=True)
+        mask |= pc.fill_null(hits, False).to_numpy(zero_copy_only=False)
+    return mask
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+SQL_TYPES = [(pa.types.is_integer, 'INTEGER'), (pa.types.is_floating, 'REAL'), (pa.types.is_timestamp, 'TEXT')]
+SQL_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def sql_type(arrow_type):
+    return next((sql for check, sql in SQL_TYPES if check(arrow_type)), 'TEXT')
+
+
+class SqliteStore(Store):
+    """One table in a local SQLite database running in WAL mode.
+
+    Every append and delete is a single transaction, so concurrent writers
+    never overwrite each other and readers keep a consistent snapshot.
+    Deletes remove the rows at once (there is nothing to compact) and are
+    also logged in ``<table>_deletes`` for cursors. Row IDs are the integer
+    primary key and are never reused. Timestamps are stored as ISO text.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path=SQLITE_FILE, table='sales', schema=ARROW_SCHEMA, coerce=to_table,
+                 initial=INITIAL_DATA, index=(), keep_rejects=True):
+        super().__init__(path)
+        self.keep_rejects = keep_rejects
+        self.table = table
+        self.schema = schema
+        self.columns = schema.names
+        self.coerce = coerce
+        self.initial = initial
+        self.index = index
+        self.deletes_table = f'{table}_deletes'
+        self.meta_table = f'{table}_meta'
+        self.select_list = ', '.join(quote(c) for c in self.columns)
+
+    @contextmanager
+    def connect(self):
+        con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute('PRAGMA synchronous=NORMAL')
+            yield con
+        finally:
+            con.close()
+
+    @contextmanager
+    def transaction(self):
+        with self.connect() as con:
+            con.execute('BEGIN IMMEDIATE')
+            try:
+                yield con
+            except BaseException:
+                con.execute('ROLLBACK')
+                raise
+            con.execute(f'UPDATE {self.meta_table} SET version = version + 1')
+            con.execute('COMMIT')
+
+    def meta(self, con):
+        return con.execute(f'SELECT version, next_row_id, generation FROM {self.meta_table}').fetchone()
+
+    def query(self, sql, params=()):
+        """Run a read-only query and return the (small) result as a frame."""
+        self.ensure()
+        with self.connect() as con:
+            return pd.read_sql_query(sql, con, params=list(params))
+
+    def exists(self):
+        if not os.path.exists(self.path):
+            return False
+        with self.connect() as con:
+            return con.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                               (self.meta_table,)).fetchone() is not None
+
+    def initialize(self):
+        columns = ', '.join(f'{quote(f.name)} {sql_type(f.type)}' for f in self.schema)
+        with self.connect() as con:
+            con.execute('BEGIN IMMEDIATE')
+            con.execute(f'CREATE TABLE {self.table} (row_id INTEGER PRIMARY KEY, {columns})')
+            con.execute(f'CREATE TABLE {self.deletes_table} (seq INTEGER PRIMARY KEY, row_id INTEGER NOT NULL)')
+            con.execute(f'CREATE TABLE {self.meta_table} (version INTEGER, next_row_id INTEGER, generation INTEGER)')
+            con.execute(f'INSERT INTO {self.meta_table} VALUES (0, 0, 0)')
+            for column in self.index:
+                con.execute(f'CREATE INDEX {self.table}_{column.replace(" ", "_")} ON {self.table} ({quote(column)})')
+            con.execute('COMMIT')
+        if self.initial is not None:
+            self.write_rows(self.encode(pd.DataFrame(self.initial)))
+
+    def upgrade(self):
+        """Add columns the schema gained since the table was created, as nulls."""
+        with self.connect() as con:
+            have = {row[1] for row in con.execute(f'PRAGMA table_info({self.table})')}
+        missing = [field for field in self.schema if field.name not in have]
+        if missing:
+            with self.transaction() as con:
+                for field in missing:
+                    con.execute(f'ALTER TABLE {self.table} ADD COLUMN {quote(field.name)} {sql_type(field.type)}')
+
+    def files(self):
+        return [self.path]
+
+    def version(self):
+        with self.connect() as con:
+            version, _, generation = self.meta(con)
+        return (os.stat(self.path).st_ino, generation, version)
+
+    def generation(self):
+        with self.connect() as con:
+            return f"{os.stat(self.path).st_ino}:{self.meta(con)[2]}"
+
+    def stored_rows(self):
+        # Row IDs restart at 0 on reset and are never reused, so this counts deleted rows too.
+        with self.connect() as con:
+            return self.meta(con)[1]
+
+    def _to_sql(self, table):
+        frame = table.to_pandas()
+        for field in self.schema:
+            if pa.types.is_timestamp(field.type):
+                frame[field.name] = frame[field.name].dt.strftime(SQL_TIMESTAMP_FORMAT)
+        return frame.astype(object).where(frame.notna(), None)
+
+    def _from_sql(self, frame):
+        frame.index.name = None
+        for field in self.schema:
+            if field.name not in frame:
+                continue
+            if pa.types.is_timestamp(field.type):
+                frame[field.name] = pd.to_datetime(frame[field.name], format=SQL_TIMESTAMP_FORMAT)
+            elif pa.types.is_floating(field.type):
+                frame[field.name] = frame[field.name].astype('float64')
+        return frame
+
+    def _insert(self, con, table):
+        start = self.meta(con)[1]
+        values = self._to_sql(table)
+        values.insert(0, 'row_id', range(start, start + len(values)))
+        placeholders = ', '.join('?' * (len(self.columns) + 1))
+        con.executemany(f'INSERT INTO {self.table} (row_id, {self.select_list}) VALUES ({placeholders})',
+                        values.itertuples(index=False, name=None))
+        con.execute(f'UPDATE {self.meta_table} SET next_row_id = ?', (start + len(values),))
+
+    def read(self, columns):
+        columns = columns or self.columns
+        with self.connect() as con:
+            con.execute('BEGIN')
+            next_row_id = self.meta(con)[1]
+            frame = pd.read_sql_query(f'SELECT row_id, {", ".join(quote(c) for c in columns)} '
+                                      f'FROM {self.table} ORDER BY row_id', con, index_col='row_id')
+            con.execute('COMMIT')
+        return self._from_sql(frame), next_row_id
+
+    def read_chunks(self, chunksize, cursor):
+        with self.connect() as con:
+            # One read transaction is one snapshot, however long the scan takes.
+            con.execute('BEGIN')
+            try:
+                end = self.meta(con)[1]
+                chunks = pd.read_sql_query(
+                    f'SELECT row_id, {self.select_list} FROM {self.table} '
+                    f'WHERE row_id >= ? AND row_id < ? ORDER BY row_id',
+                    con, params=(cursor['rows'], end), index_col='row_id', chunksize=chunksize)
+                for chunk in chunks:
+                    cursor['rows'] = int(chunk.index[-1]) + 1
+                    yield self._from_sql(chunk)
+                cursor['rows'] = end
+            finally:
+                con.execute('COMMIT')
+
+    def prefix_unchanged(self, cursor):
+        # Rows are never edited in place; deletes are checked via delete_log().
+        return True
+
+    def read_page(self, offset, limit, sort, ascending, search):
+        where, params = '', []
+        if search:
+            pattern = '%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            names = searchable(self.columns)
+            where = 'WHERE ' + ' OR '.join(f"CAST({quote(c)} AS TEXT) LIKE ? ESCAPE '\\'" for c in names)
+            params = [pattern] * len(names)
+        order = f'{quote(sort)} IS NULL, {quote(sort)} {"ASC" if ascending else "DESC"}, ' if sort else ''
+        with self.connect() as con:
+            con.execute('BEGIN')
+            total = con.execute(f'SELECT COUNT(*) FROM {self.table} {where}', params).fetchone()[0]
+            frame = pd.read_sql_query(f'SELECT row_id, {self.select_list} FROM {self.table} {where} '
+                                      f'ORDER BY {order}row_id LIMIT ? OFFSET ?',
+                                      con, params=params + [limit, offset], index_col='row_id')
+            con.execute('COMMIT')
+        return self._from_sql(frame), total
+
+    def encode(self, rows):
+        return self.coerce(rows)
+
+    def write_rows(self, table):
+        with self.transaction() as con:
+            self._insert(con, table)
+
+    def added_frame(self, table):
+        return table.to_pandas()
+
+    def write_deletes(self, row_ids):
+        with self.transaction() as con:
+            con.executemany(f'DELETE FROM {self.table} WHERE row_id = ?', ((i,) for i in row_ids))
+            con.executemany(f'INSERT INTO {self.deletes_table} (row_id) VALUES (?)', ((i,) for i in row_ids))
+
+    def delete_log(self):
+        with self.connect() as con:
+            return [row_id for (row_id,) in
+                    con.execute(f'SELECT row_id FROM {self.deletes_table} ORDER BY seq')]
+
+    def pending_deletes(self):
+        return 0
+
+    def compact(self):
+        """Deletes are applied when they are made, so there is nothing to fold in."""
+        return 0
+
+    def reset(self, tables):
+        """Replace every row with ``tables`` in one transaction; readers see old or new."""
+        self.ensure()
+        with file_lock(self.path):
+            with self.transaction() as con:
+                con.execute(f'DELETE FROM {self.table}')
+                con.execute(f'DELETE FROM {self.deletes_table}')
+                con.execute(f'UPDATE {self.meta_table} SET next_row_id = 0, generation = generation + 1')
+                for table in tables:
+                    self._insert(con, table)
+            self.invalidate()
+
+
+BACKENDS = {CsvStore.name: CsvStore, ArrowStore.name: ArrowStore, SqliteStore.name: SqliteStore}
+STORE_BACKEND = os.environ.get('SALES_STORE', 'auto')
+_stores = {}
+
+
+def get_store(backend=None):
+    """The working store: ``SALES_STORE``, or on ``auto`` whatever was migrated to."""
+    backend = backend or STORE_BACKEND
+    if backend == 'auto':
+        backend = (SqliteStore.name if os.path.exists(SQLITE_FILE)
+                   else ArrowStore.name if os.path.exists(ARROW_FILE) else CsvStore.name)
+    if backend not in _stores:
+        _stores[backend] = BACKENDS[backend]()
+    return _stores[backend]
+
+
+# ── Module API used by the app ───────────────────────────────────────────────
+def load_data(columns=None):
+    return get_store().load(columns)
+
+
+def append_rows(rows):
+    return get_store().append(rows)
+
+
+def delete_rows(row_ids, generation=None):
+    return get_store().delete(row_ids, generation)
+
+
+def generation():
+    """Read before the rows whose IDs will be passed to delete_rows()."""
+    store = get_store()
+    store.ensure()
+    return store.generation()
+
+
+def compact():
+    return get_store().compact()
+
+
+def pending_deletes():
+    return get_store().pending_deletes()
+
+
+def invalidate():
+    get_store().invalidate()
+
+
+# ── CSV import / export ──────────────────────────────────────────────────────
+def migrate_csv(csv_path=DATA_FILE, target=None, chunksize=CHUNK_ROWS):
+    """One-shot conversion of the CSV (minus its tombstones) into ``target``.
+
+    ``target`` is an ArrowStore or SqliteStore; the default is the Arrow store.
+    """
+    rows = 0
+
+    def tables():
+        nonlocal rows
+        for chunk in CsvStore(csv_path).iter_chunks(chunksize):
+            rows += len(chunk)
+            yield to_table(chunk)
+
+    (target or ArrowStore()).reset(tables())
+    return rows
+
+
+def import_csv(src, store=None, chunksize=CHUNK_ROWS):
+    store = store or get_store()
+    return sum(store.append(chunk) for chunk in pd.read_csv(src, chunksize=chunksize, dtype=str))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sales data store maintenance")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_migrate = sub.add_parser('migrate', help=f"convert {DATA_FILE} into a typed store")
+    p_migrate.add_argument('--to', choices=[ArrowStore.name, SqliteStore.name], default=ArrowStore.name)
+    p_export = sub.add_parser('export', help="write the working store out as CSV")
+    p_export.add_argument('dest')
+    p_import = sub.add_parser('import', help="append a CSV file to the working store")
+    p_import.add_argument('src')
+    sub.add_parser('compact', help="fold pending deletes into the data files")
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        target = BACKENDS[args.to]()
+        print(f"migrated {migrate_csv(target=target)} rows into {target.path}")
+    elif args.command == 'export':
+        get_store().export_csv(args.dest)
+        print(f"exported the {get_store().name} store to {args.dest}")
+    elif args.command == 'import':
+        print(f"imported {import_csv(args.src)} rows")
+    elif args.command == 'compact':
+        print(f"removed {compact()} rows")
@@ -0,0 +1,236 @@
+import re
+
+# ── Global CSS: Warm Earthy Professional ──────────────────────────────────────
+CSS = """
+/* Import fonts */
+@import url('https://fonts.googleapis.com/css2?family=Instrument+Serif:ital@0;1&family=DM+Sans:wght@300;400;500;600&family=DM+Mono:wght@400;500&display=swap');
+
+/* Root variables — warm earthy palette */
+:root {
+    --bg:            #F5F0EB;
+    --bg-alt:        #EDE7DE;
+    --surface:       #FAF7F4;
+    --surface-2:     #F0EAE1;
+    --border:        #DDD5C8;
+    --border-strong: #C9BFB0;
+    --text-primary:  #2C2418;
+    --text-secondary:#7A6E62;
+    --accent:        #B35C2A;
+    --accent-light:  #F5EDE5;
+    --accent-2:      #5C8C6E;
+    --success:       #4A7C5A;
+    --warning:       #B8870A;
+    --danger:        #A83232;
+    --radius:        12px;
+    --shadow:        0 2px 12px rgba(44,36,24,0.08);
+}
+
+/* Base */
+html, body, [class*="css"] {
+    font-family: 'DM Sans', sans-serif;
+    color: var(--text-primary);
+}
+
+.stApp { background: var(--bg); }
+
+/* Hide default streamlit chrome */
+#MainMenu, footer, header { visibility: hidden; }
+.block-container {
+    padding: 2.5rem 3.5rem 4rem 3.5rem;
+    max-width: 1240px;
+}
+
+/* Title area — editorial serif display */
+h1 {
+    font-family: 'Instrument Serif', Georgia, serif !important;
+    font-size: 2rem !important;
+    font-weight: 400 !important;
+    letter-spacing: -0.01em;
+    color: var(--text-primary) !important;
+    margin-bottom: 0.1rem !important;
+    line-height: 1.2 !important;
+}
+
+h2 {
+    font-family: 'Instrument Serif', Georgia, serif !important;
+    font-size: 1.35rem !important;
+    font-weight: 400 !important;
+    letter-spacing: -0.01em;
+    color: var(--text-primary) !important;
+    border-bottom: 1px solid var(--border) !important;
+    padding-bottom: 0.5rem !important;
+    margin-bottom: 1.2rem !important;
+}
+
+h3 {
+    font-size: 1rem !important;
+    font-weight: 600 !important;
+    color: var(--text-primary) !important;
+    letter-spacing: 0.01em;
+}
+
+/* Sidebar — warm toned */
+[data-testid="stSidebar"] {
+    background: var(--surface) !important;
+    border-right: 1px solid var(--border) !important;
+}
+
+[data-testid="stSidebar"] .stRadio label {
+    font-size: 0.84rem;
+    color: var(--text-secondary);
+    padding: 0.45rem 0;
+    transition: color 0.15s;
+}
+
+[data-testid="stSidebar"] .stRadio label:hover {
+    color: var(--accent) !important;
+}
+
+/* Metric cards — warm shadow */
+[data-testid="stMetric"] {
+    background: var(--surface);
+    border: 1px solid var(--border);
+    border-radius: var(--radius);
+    padding: 1.1rem 1.4rem !important;
+    box-shadow: var(--shadow);
+    border-top: 3px solid var(--accent) !important;
+}
+
+[data-testid="stMetricLabel"] {
+    font-size: 0.7rem;
+    color: var(--text-secondary);
+    text-transform: uppercase;
+    letter-spacing: 0.08em;
+    font-weight: 600;
+}
+[data-testid="stMetricValue"] {
+    font-family: 'Instrument Serif', Georgia, serif;
+    font-size: 2rem;
+    font-weight: 400;
+    color: var(--accent);
+}
+[data-testid="stMetricDelta"] { font-size: 0.8rem; }
+
+/* Tables */
+[data-testid="stTable"] table, .stDataFrame table {
+    font-size: 0.82rem;
+    border-collapse: collapse;
+    width: 100%;
+    background: var(--surface);
+    border-radius: var(--radius);
+    overflow: hidden;
+}
+
+[data-testid="stTable"] thead th, .stDataFrame thead th {
+    background: var(--bg-alt) !important;
+    color: var(--text-secondary);
+    font-weight: 600;
+    font-size: 0.7rem;
+    text-transform: uppercase;
+    letter-spacing: 0.08em;
+    padding: 0.7rem 1rem !important;
+    border-bottom: 2px solid var(--border-strong) !important;
+}
+
+[data-testid="stTable"] tbody td, .stDataFrame tbody td {
+    padding: 0.6rem 1rem !important;
+    border-bottom: 1px solid var(--border) !important;
+    color: var(--text-primary);
+    font-family: 'DM Mono', monospace;
+    font-size: 0.79rem;
+    background: var(--surface);
+}
+
+[data-testid="stTable"] tbody tr:nth-child(even) td,
+.stDataFrame tbody tr:nth-child(even) td {
+    background: var(--surface-2) !important;
+}
+
+[data-testid="stTable"] tbody tr:hover td,
+.stDataFrame tbody tr:hover td {
+    background: var(--accent-light) !important;
+}
+
+/* Buttons */
+.stButton > button {
+    background: var(--accent);
+    color: #FAF7F4;
+    border: none;
+    border-radius: 8px;
+    padding: 0.5rem 1.3rem;
+    font-family: 'DM Sans', sans-serif;
+    font-size: 0.82rem;
+    font-weight: 600;
+    cursor: pointer;
+    transition: all 0.18s ease;
+    letter-spacing: 0.02em;
+    box-shadow: 0 1px 4px rgba(179,92,42,0.3);
+}
+.stButton > button:hover {
+    background: #9B4E22;
+    box-shadow: 0 3px 12px rgba(179,92,42,0.35);
+    transform: translateY(-1px);
+}
+
+/* Alerts */
+.stSuccess, .stInfo, .stWarning, .stError {
+    border-radius: var(--radius) !important;
+    font-size: 0.84rem !important;
+}
+.stSuccess { border-left: 4px solid var(--success) !important;  background: #EDF5F0 !important; border: 1px solid #C4DDD0 !important; }
+.stInfo    { border-left: 4px solid var(--accent) !important;   background: var(--accent-light) !important; border: 1px solid #E0C9B5 !important; }
+.stWarning { border-left: 4px solid var(--warning) !important;  background: #FDF5DC !important; border: 1px solid #E8D68A !important; }
+.stError   { border-left: 4px solid var(--danger) !important;   background: #FAEAEA !important; border: 1px solid #E0B0B0 !important; }
+
+/* Expander */
+details {
+    border: 1px solid var(--border) !important;
+    border-radius: var(--radius) !important;
+    padding: 0.3rem 0.5rem !important;
+    background: var(--surface);
+    box-shadow: var(--shadow);
+}
+summary { font-size: 0.85rem; font-weight: 600; color: var(--text-primary); }
+
+/* Divider */
+hr { border-color: var(--border) !important; margin: 2rem 0 !important; }
+
+/* Forms */
+.stTextInput input, .stNumberInput input, .stSelectbox select {
+    border: 1px solid var(--border-strong) !important;
+    border-radius: 8px !important;
+    font-size: 0.84rem !important;
+    font-family: 'DM Sans', sans-serif !important;
+    background: var(--surface) !important;
+    color: var(--text-primary) !important;
+}
+.stTextInput input:focus, .stNumberInput input:focus {
+    border-color: var(--accent) !important;
+    box-shadow: 0 0 0 3px rgba(179,92,42,0.12) !important;
+}
+
+/* Section header stripe */
+.section-badge {
+    display: inline-block;
+    background: var(--accent);
+    color: #FAF7F4;
+    font-size: 0.68rem;
+    font-weight: 700;
+    letter-spacing: 0.1em;
+    text-transform: uppercase;
+    padding: 0.2rem 0.6rem;
+    border-radius: 4px;
+    margin-bottom: 0.5rem;
+}
+"""
+
+
+def minify(css):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    return re.sub(r':\s+', ':', css).strip()
+
+
+# Built once per process; app.py only sends the finished tag.
+STYLE_TAG = f"<style>{minify(CSS)}</style>"
@@ -0,0 +1,123 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import schema
+import store
+
+PAGE_SIZES = [25, 50, 100, 250]
+NO_SORT = "(ตามลำดับแถว)"
+MAX_ORDERS = 16
+
+# (cache key, search, sort column, ascending) -> row positions, newest last
+_orders = OrderedDict()
+_lock = threading.Lock()
+
+
+def search_mask(frame, text):
+    """Rows where any column's text contains ``text`` (case-insensitive).
+
+    Categorical columns are searched through their categories, and dates
+    and numbers through the text of their distinct values (so 2023 finds
+    dates in 2023); the cost is the number of distinct values, not rows.
+    """
+    mask = np.zeros(len(frame), dtype=bool)
+    for name in frame.columns.drop(schema.DERIVED_COLUMN, errors='ignore'):
+        col = frame[name]
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            hits = col.cat.categories.astype(str).str.contains(text, case=False, regex=False)
+            mask |= np.isin(col.cat.codes.to_numpy(), np.flatnonzero(hits))
+        elif col.dtype == object:
+            mask |= col.astype(str).str.contains(text, case=False, regex=False).to_numpy()
+        else:
+            values = pd.Series(col.dropna().unique())
+            hits = values[values.astype(str).str.contains(text, case=False, regex=False)]
+            mask |= col.isin(hits).to_numpy(dtype=bool, na_value=False)
+    return mask
+
+
+def sort_positions(col, ascending):
+    col = col.reset_index(drop=True)
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        # Categories are kept in arrival order; sort by their text instead.
+        col = col.cat.set_categories(col.cat.categories.sort_values())
+    return col.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+
+
+def row_order(frame, cache_key, search, sort, ascending):
+    """Positions of the rows to show, in order; memoized when ``cache_key`` is given."""
+    key = (cache_key, search, sort, ascending)
+    if cache_key is not None:
+        with _lock:
+            if key in _orders:
+                _orders.move_to_end(key)
+                return _orders[key]
+    positions = np.arange(len(frame))
+    if search:
+        positions = positions[search_mask(frame, search)]
+    if sort != NO_SORT:
+        positions = positions[sort_positions(frame[sort].iloc[positions], ascending)]
+    if cache_key is not None:
+        with _lock:
+            _orders[key] = positions
+            while len(_orders) > MAX_ORDERS:
+                _orders.popitem(last=False)
+    return positions
+
+
+def controls(columns, key):
+    """(search, sort column, ascending, page size) from the widgets above a table."""
+    c1, c2, c3, c4 = st.columns([3, 2, 1, 1])
+    search    = c1.text_input("ค้นหา", key=f"{key}_search").strip()
+    sort      = c2.selectbox("เรียงตาม", [NO_SORT] + list(columns), key=f"{key}_sort")
+    ascending = c3.selectbox("ลำดับ", ["น้อย→มาก", "มาก→น้อย"], key=f"{key}_order") == "น้อย→มาก"
+    page_size = c4.selectbox("แถวต่อหน้า", PAGE_SIZES, key=f"{key}_size")
+    return search, sort, ascending, page_size
+
+
+def page_start(total, page_size, key):
+    pages = max(1, -(-total // page_size))
+    # Keyed on the page count so a narrower search starts again at page 1.
+    page = st.number_input(f"หน้า (จาก {pages:,})", min_value=1, max_value=pages, step=1,
+                           key=f"{key}_page_{pages}")
+    return (page - 1) * page_size
+
+
+def show_page(rows, start, total, fmt):
+    st.dataframe(fmt(rows) if fmt else rows, use_container_width=True)
+    st.caption(f"แถว {min(start + 1, total):,}–{start + len(rows):,} จากทั้งหมด {total:,} แถว")
+
+
+def paged_table(frame, key, cache_key=None, fmt=None):
+    """Show ``frame`` one page at a time with page size, sort and search.
+
+    Only the visible page is sliced out and sent to the browser. Pass a
+    ``cache_key`` that changes with the data (e.g. a store version) to
+    reuse sort and search results across reruns; ``fmt`` is applied to the
+    page only.
+    """
+    helpers = schema.helper_columns(frame)
+    search, sort, ascending, page_size = controls([c for c in frame.columns if c not in helpers], key)
+    positions = row_order(frame, cache_key, search, sort, ascending)
+    total = len(positions)
+    start = page_start(total, page_size, key)
+    show_page(frame.iloc[positions[start:start + page_size]], start, total, fmt)
+
+
+def paged_store(source, key, fmt=None):
+    """paged_table for a whole typed store, read page by page (see Store.page).
+
+    Counting, sorting and searching happen in the store, so the rows are
+    never loaded into one frame.
+    """
+    search, sort, ascending, page_size = controls(store.searchable(source.columns), key)
+    sort = None if sort == NO_SORT else sort
+    # The count comes with the page, so the first request also sizes the page picker.
+    rows, total = source.page(0, page_size, sort, ascending, search)
+    start = page_start(total, page_size, key)
+    if start:
+        rows, total = source.page(start, page_size, sort, ascending, search)
+    show_page(rows, start, total, fmt)